@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Iterable, Iterator
+
+from smiles_tools import normalize_smiles
+
+DEFAULT_ARCHIVE_PATH = os.environ.get(
+    "AUTOSMILES_ARCHIVE",
+    os.path.join(os.path.expanduser("~"), ".autosmiles2iupac", "archive.sqlite3"),
+)
+
+# SQLite's default limit on bound parameters per statement is 999 on older builds.
+_LOOKUP_CHUNK = 900
+
+
+def _record(row: tuple) -> dict:
+    """
+    (smiles, iupac_name, error, attempts) -> a record in the output-file format.
+    """
+    smiles, iupac_name, error, attempts = row
+    record = {"smiles": smiles, "iupac_name": iupac_name}
+    if error is not None:
+        record["error"] = error
+    if attempts is not None:
+        record["attempts"] = attempts
+    return record
+
+
+class archive_run:
+    def __init__(self, archive: "result_archive", run_id: int, mode: str, commit_every: int = 1000):
+        """
+        Sink for one conversion run: write()/amend() like output.result_writer, committed
+        every commit_every records and on close().
+        """
+        self.archive = archive
+        self.run_id = run_id
+        self.mode = mode
+        self.commit_every = commit_every
+        self.done = 0
+        self._rows = []
+
+    def write(self, record: dict) -> None:
+        self._rows.append(self.archive._row(self.run_id, self.done, record, self.mode, time.time()))
+        self.done += 1
+        if len(self._rows) >= self.commit_every:
+            self.flush()
+
+    def amend(self, index: int, record: dict) -> None:
+        """
+        Replace the index-th record written to this run.
+        """
+        self.flush()
+        self.archive._insert([self.archive._row(self.run_id, index, record, self.mode, time.time())])
+
+    def tee(self, sink, amend):
+        """
+        (sink, amend) that also record into this run.
+        """
+        def tee_sink(record: dict) -> None:
+            sink(record)
+            self.write(record)
+
+        def tee_amend(index: int, record: dict) -> None:
+            amend(index, record)
+            self.amend(index, record)
+
+        return tee_sink, tee_amend
+
+    def flush(self) -> None:
+        if self._rows:
+            self.archive._insert(self._rows)
+            self._rows = []
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class result_archive:
+    def __init__(self, path: str | None = None):
+        """
+        所有转换结果的归档（SQLite），按规范化的 SMILES 建索引，点查询只需毫秒级。
+        每条记录带 run（来源文件/时间）、mode、时间戳、attempts 和失败类型（error）。
+        同一个 SMILES 可以有多条记录（不同的 run）；lookup 返回最好的一条：成功优先，其次最新。
+        可以在多个线程间共享。
+        """
+        self.path = path or DEFAULT_ARCHIVE_PATH
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY,
+                source TEXT,
+                mode TEXT NOT NULL,
+                started REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                run_id INTEGER NOT NULL REFERENCES runs (run_id),
+                idx INTEGER NOT NULL,
+                smiles TEXT NOT NULL,
+                key TEXT NOT NULL,
+                iupac_name TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                created REAL NOT NULL,
+                attempts INTEGER,
+                error TEXT,
+                PRIMARY KEY (run_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS results_key ON results (key, mode);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _row(run_id: int, index: int, record: dict, mode: str, created: float) -> tuple:
+        smiles = record["smiles"]
+        return (
+            run_id, index, smiles, normalize_smiles(smiles), record["iupac_name"], mode,
+            created, record.get("attempts"), record.get("error"),
+        )
+
+    def _insert(self, rows: list[tuple]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results "
+                "(run_id, idx, smiles, key, iupac_name, mode, created, attempts, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    # -- writing ----------------------------------------------------------------
+
+    def start_run(self, source: str | None = None, mode: str = "plain", started: float | None = None) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (source, mode, started) VALUES (?, ?, ?)",
+                (source, mode, time.time() if started is None else started),
+            )
+            return cur.lastrowid
+
+    def run_writer(self, source: str | None = None, mode: str = "plain") -> archive_run:
+        """
+        A new run and a sink that appends its records in order.
+        """
+        return archive_run(self, self.start_run(source, mode), mode)
+
+    def import_json(self, path: str, mode: str = "plain") -> int:
+        """
+        Import an output file of run.py / cli.py ({smiles_file}.json, a JSON array) as one
+        run, timestamped with the file's mtime. Returns the number of records.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        started = os.path.getmtime(path)
+        run_id = self.start_run(os.path.abspath(path), mode, started)
+        rows = [self._row(run_id, i, record, mode, started) for i, record in enumerate(records)]
+        self._insert(rows)
+        return len(rows)
+
+    # -- reading ----------------------------------------------------------------
+
+    def runs(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT runs.run_id, source, runs.mode, started, COUNT(idx), COUNT(error) "
+                "FROM runs LEFT JOIN results USING (run_id) GROUP BY runs.run_id ORDER BY runs.run_id"
+            ).fetchall()
+        return [
+            {"run_id": r[0], "source": r[1], "mode": r[2], "started": r[3], "records": r[4], "failed": r[5]}
+            for r in rows
+        ]
+
+    def iter_run(self, run_id: int) -> Iterator[dict]:
+        """
+        The records of one run, in input order.
+        """
+        cur = self._conn.cursor()
+        cur.execute(
+            "SELECT smiles, iupac_name, error, attempts FROM results WHERE run_id = ? ORDER BY idx",
+            (run_id,),
+        )
+        for row in cur:
+            yield _record(row)
+
+    def lookup(self, smiles: str, mode: str = "plain") -> dict | None:
+        """
+        The best record for a SMILES (written in any equivalent form), or None.
+        """
+        return self.lookup_many([smiles], mode).get(smiles)
+
+    def lookup_many(self, smiles_list: Iterable[str], mode: str = "plain") -> dict[str, dict]:
+        """
+        Bulk lookup: {input smiles: best record} for the SMILES that are in the archive.
+        Queried in chunks of a few hundred keys, each one index probe per key.
+        """
+        wanted: dict[str, list[str]] = {}
+        for smiles in smiles_list:
+            wanted.setdefault(normalize_smiles(smiles), []).append(smiles)
+        keys = list(wanted)
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[start:start + _LOOKUP_CHUNK]
+                rows = self._conn.execute(
+                    "SELECT key, smiles, iupac_name, error, attempts FROM results "
+                    f"WHERE mode = ? AND key IN ({', '.join('?' * len(chunk))}) "
+                    "ORDER BY key, error IS NOT NULL, created DESC, run_id DESC",
+                    (mode, *chunk),
+                ).fetchall()
+                for key, *row in rows:
+                    if key not in found:
+                        found[key] = _record(tuple(row))
+        return {smiles: found[key] for key, inputs in wanted.items() if key in found for smiles in inputs}
+
+    def export_json(self, run_id: int, path: str) -> int:
+        """
+        Write one run in the format of run.py's {smiles_file}.json (streamed, via a temp
+        file and os.replace). Returns the number of records.
+        """
+        tmp_path = f"{path}.tmp"
+        count = 0
+        with open(tmp_path, "w") as dst:
+            for record in self.iter_run(run_id):
+                item = json.dumps(record, indent=4).replace("\n", "\n    ")
+                dst.write(("[\n    " if count == 0 else ",\n    ") + item)
+                count += 1
+            dst.write("[]" if count == 0 else "\n]")
+        os.replace(tmp_path, path)
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Indexed archive of conversion results (SQLite).")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="导入 run.py / cli.py 输出的 JSON 文件（每个文件一个 run）")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--mode", choices=("plain", "split"), default="plain")
+
+    p = sub.add_parser("export", help="把一个 run 导出成与界面相同格式的 JSON 文件")
+    p.add_argument("run_id", type=int)
+    p.add_argument("-o", "--output", required=True)
+
+    p = sub.add_parser("lookup", help="按 SMILES 查询，输出 JSONL（未找到的不输出）")
+    p.add_argument("smiles", nargs="*", help="不给出时从 stdin 逐行读取")
+    p.add_argument("--mode", choices=("plain", "split"), default="plain")
+
+    sub.add_parser("runs", help="列出所有 run")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    with result_archive(args.archive) as archive:
+        if args.command == "import":
+            for path in args.files:
+                print(f"{path}: {archive.import_json(path, args.mode)} records", file=sys.stderr)
+        elif args.command == "export":
+            print(f"{archive.export_json(args.run_id, args.output)} records", file=sys.stderr)
+        elif args.command == "lookup":
+            from pipeline import iter_smiles
+
+            smiles_list = args.smiles or list(iter_smiles(sys.stdin))
+            found = archive.lookup_many(smiles_list, args.mode)
+            for smiles in smiles_list:
+                if smiles in found:
+                    sys.stdout.write(json.dumps({**found[smiles], "smiles": smiles}, ensure_ascii=False) + "\n")
+        else:
+            for run in archive.runs():
+                print(json.dumps(run, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+from frames import frame_source
+
+
+class backend:
+    """
+    Everything the workers need from the machine: screen frames, key/mouse injection
+    and the clipboard. Coordinates are screen pixels (the space frames are in).
+    """
+
+    frame_source: frame_source
+
+    def press_keys(self, keys: list[str]) -> None:
+        raise NotImplementedError
+
+    def click(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def get_clipboard_text(self) -> str:
+        raise NotImplementedError
+
+    def write_to_clipboard(self, text: str) -> None:
+        raise NotImplementedError
+
+    def clipboard_change_count(self) -> int:
+        raise NotImplementedError
+
+    def is_space_pressed(self) -> bool:
+        return False
+
+
+def default_backend() -> backend:
+    """
+    The live macOS backend (Quartz/AppKit), imported only when it is needed.
+    """
+    from macos_backend import macos_backend
+
+    return macos_backend()
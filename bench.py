@@ -0,0 +1,495 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+
+from frames import bgra_gray_converter
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "5k": (5120, 2880),
+}
+
+SAMPLE_SMILES = [
+    "CCO",
+    "c1ccccc1C(=O)O",
+    "CC1=C2C(C(=O)C3(C(CC4C(C3C(C(C2(C)C)(CC1OC(=O)C5=CC=CC=C5)O)OC(=O)C6=CC=CC=C6)(CO4)OC(=O)C)O)C)OC(=O)C7=CC=CC=C7",
+    "CN1C=NC2=C1C(=O)N(C(=O)N2C)C",
+]
+SAMPLE_SPLIT_SMILES = ["*CCO", "*c1ccccc1", "*C(=O)N*"]
+# Drug-like molecules of typical length (20-35 characters).
+DRUG_SMILES = [
+    "CC(=O)Oc1ccccc1C(=O)O",
+    "CC(C)Cc1ccc(cc1)[C@@H](C)C(=O)O",
+    "CN1C=NC2=C1C(=O)N(C(=O)N2C)C",
+    "CN1CCC[C@H]1c2cccnc2",
+    "COc1ccc2[nH]cc(CCNC(C)=O)c2c1",
+    "CC(C)NCC(O)c1ccc(O)c(CO)c1",
+    "O=C(O)Cc1ccccc1Nc1c(Cl)cccc1Cl",
+    "CN(C)CCCN1c2ccccc2CCc2ccccc21",
+    "Clc1ccc2c(c1)C(=NCc1nncn1-2)c1ccccc1",
+    "CC(=O)Nc1ccc(O)cc1",
+]
+# The drug-like set plus split-mode inputs and the kinds of broken lines seen in scraped data.
+VALIDATION_SMILES = SAMPLE_SMILES + SAMPLE_SPLIT_SMILES + DRUG_SMILES + [
+    "[Na+].[Cl-]",
+    "[*:1]c1ccc([*:2])cc1",
+    "C1CC",
+    "CC(C",
+    "C[Xx]C",
+    "CC==O",
+    "C=1CCCCC=1",
+    "C=1CCCCC-1",
+    "c1ccc%12ccccc%12c1",
+]
+
+PLATFORM_MODULES = ("PyQt6", "Quartz", "AppKit", "keyboard")
+# Entry point / component -> (import-time budget in seconds, modules it must not load).
+# The command-line tools and the split/I-O parts stay free of NumPy and of everything
+# macOS-only; the detector may pull NumPy but not OpenCV or PIL until they are used.
+IMPORT_BUDGETS = {
+    "cli": (0.15, ("numpy", "PIL", "cv2") + PLATFORM_MODULES),
+    "coordinator": (0.15, ("numpy", "PIL", "cv2") + PLATFORM_MODULES),
+    "archive": (0.15, ("numpy", "PIL", "cv2") + PLATFORM_MODULES),
+    "pipeline": (0.15, ("numpy", "PIL", "cv2") + PLATFORM_MODULES),
+    "scoring": (0.4, ("PIL", "cv2") + PLATFORM_MODULES),
+    "chem_draw": (0.4, ("PIL", "cv2") + PLATFORM_MODULES),
+    "replay": (0.4, ("PIL", "cv2") + PLATFORM_MODULES),
+    "gui_worker": (0.6, ("numpy", "PIL", "cv2", "Quartz", "AppKit", "keyboard")),
+    "run": (0.6, ("numpy", "PIL", "cv2", "Quartz", "AppKit", "keyboard")),
+    "run_split": (0.6, ("numpy", "PIL", "cv2", "Quartz", "AppKit", "keyboard")),
+}
+_IMPORT_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+try:
+    import {module}
+except ImportError as exc:
+    print(json.dumps({{"missing": exc.name}}))
+else:
+    print(json.dumps({{"seconds": time.perf_counter() - t0, "loaded": sorted(m for m in sys.modules if "." not in m)}}))
+"""
+
+
+def fake_bgra(width: int, height: int, row_padding: int = 64, seed: int = 0) -> tuple[bytes, int]:
+    """
+    A random BGRA frame with padded rows, like CGImage buffers. Returns (buffer, bytes_per_row).
+    """
+    bytes_per_row = width * 4 + row_padding
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=height * bytes_per_row, dtype=np.uint8).tobytes(), bytes_per_row
+
+
+def pil_gray(raw: bytes, width: int, height: int, bytes_per_row: int) -> np.ndarray:
+    """
+    The previous capture path: bytes -> PIL RGBA -> "L" -> NumPy.
+    """
+    img = Image.frombuffer("RGBA", (width, height), bytes(raw), "raw", "BGRA", bytes_per_row, 1)
+    return np.array(img.convert("L"))
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def synthetic_frame_pair(width: int, height: int, smiles: str = SAMPLE_SMILES[2]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (after paste, after name generation) frames from the simulated ChemDraw at a given size.
+    """
+    from simulated import simulated_backend
+
+    b = simulated_backend(width=width, height=height, paste_latency=0.0, name_latency=0.0, copy_latency=0.0)
+    b.write_to_clipboard(smiles)
+    b.press_keys(["command", "v"])
+    pre = b.frame_source.grab()
+    b.press_keys(["option", "command", "n"])
+    post = b.frame_source.grab()
+    return pre, post
+
+
+def bench_gray(repeat: int = 5) -> dict:
+    """
+    BGRA -> grayscale conversion: PIL path vs bgra_gray_converter, per resolution (seconds).
+    """
+    results = {}
+    converter = bgra_gray_converter()
+    exact = bgra_gray_converter()
+    exact.use_cv2 = False
+    for name, (w, h) in RESOLUTIONS.items():
+        raw, bpr = fake_bgra(w, h)
+        out = np.empty((h, w), dtype=np.uint8)
+        reference = pil_gray(raw, w, h, bpr)
+        if not np.array_equal(reference, exact.convert(raw, w, h, bpr)):
+            raise AssertionError(f"numpy luma differs from PIL at {name}")
+        if np.abs(reference.astype(np.int16) - converter.convert(raw, w, h, bpr)).max() > 1:
+            raise AssertionError(f"converter luma is off by more than 1 at {name}")
+        results[name] = {
+            # bytes() copy included, as CGDataProviderCopyData -> bytes(data) did.
+            "pil": best_of(lambda: pil_gray(bytes(memoryview(raw)), w, h, bpr), repeat),
+            "converter": best_of(lambda: converter.convert(raw, w, h, bpr, out=out), repeat),
+            "converter_downscale2": best_of(lambda: converter.convert(raw, w, h, bpr, downscale=2), repeat),
+            "numpy": best_of(lambda: exact.convert(raw, w, h, bpr, out=out), repeat),
+        }
+    return results
+
+
+def bench_scoring(repeat: int = 3, frames: str | None = None) -> dict:
+    """
+    find_max_diff_centers per resolution: on the full frame and on the "auto" capture region.
+    frames: optional session_recorder directory. check_pyramid and check_nms run on every
+    recorded pair, on the area find_candidate_points searches (the reference NMS takes a
+    few seconds per capture-region pair); the first pair is also benchmarked as "recorded".
+    """
+    from frames import detector_region
+    from scoring import window_scorer
+    from utils import worker
+
+    w = worker.__new__(worker)  # scoring needs no backend
+    w.scorer = window_scorer()
+    pairs = {name: synthetic_frame_pair(*size) for name, size in RESOLUTIONS.items()}
+
+    w.pyramid_factor = 4
+    # Synthetic frames are checked by test_checks.py; recordings only exist locally.
+    if frames is not None:
+        from recording import session_reader
+
+        for index, (entry, pair) in enumerate(session_reader(frames)):
+            if pair is None:
+                continue
+            pre, post = pair
+            pairs.setdefault("recorded", (pre, post))
+            if not entry.get("cropped"):
+                left, top, width, height = detector_region(pre.shape[1], pre.shape[0])
+                pre, post = pre[top:top + height, left:left + width], post[top:top + height, left:left + width]
+            name = f"recorded #{index} {entry['smiles']}"
+            check_nms(w, pre, post, name, roi=(0.0, 1.0))
+            check_pyramid(w, pre, post, name, roi=(0.0, 1.0))
+    results = {}
+    for name, (pre, post) in pairs.items():
+        left, top, width, height = detector_region(pre.shape[1], pre.shape[0])
+        pre_roi = pre[top:top + height, left:left + width]
+        post_roi = post[top:top + height, left:left + width]
+        results[name] = {
+            "scoring_full": best_of(lambda: w.find_max_diff_centers(pre, post, mode="exact"), repeat),
+            "scoring_region": best_of(
+                lambda: w.find_max_diff_centers(pre_roi, post_roi, roi=(0.0, 1.0), mode="exact"), repeat
+            ),
+            "scoring_pyramid": best_of(lambda: w.find_max_diff_centers(pre, post, mode="pyramid"), repeat),
+        }
+        # Fresh scorers: the peak includes allocating the reused buffers.
+        for mode in ("exact", "pyramid"):
+            w.scorer = window_scorer()
+            results[name][f"peak_{mode}_mb"] = peak_mb(lambda: w.find_max_diff_centers(pre, post, mode=mode))
+    return results
+
+
+def peak_mb(fn) -> float:
+    """
+    Peak MB that NumPy allocates during fn(), as seen by tracemalloc.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def check_pyramid(
+    w, pre: np.ndarray, post: np.ndarray, name: str, window: int = 99, roi: tuple[float, float] = (0.2, 0.8)
+) -> None:
+    """
+    Every center of the exact search that has any score must come back from the pyramid
+    search, in the same rank, within 2*pyramid_factor pixels.
+    """
+    exact = w.find_max_diff_centers(pre, post, window=window, roi=roi, mode="exact")
+    pyramid = w.find_max_diff_centers(pre, post, window=window, roi=roi, mode="pyramid")
+    score = w._score_map(pre, post, window)
+    half = window // 2
+    tolerance = 2 * w.pyramid_factor
+    for rank, (x, y) in enumerate(exact):
+        if score[y - half, x - half] <= 0:
+            break
+        if rank >= len(pyramid) or max(abs(x - pyramid[rank][0]), abs(y - pyramid[rank][1])) > tolerance:
+            found = pyramid[rank] if rank < len(pyramid) else None
+            raise AssertionError(f"pyramid center #{rank} is {found}, exact {(x, y)} at {name}")
+
+
+def reference_nms(roi: np.ndarray, x0: int, y0: int, half: int, top_k: int, min_dist: float) -> list[tuple[int, int]]:
+    """
+    The original peak picking: sort the whole ROI (ties: larger flat index first) and walk
+    it with a hypot check against every picked center.
+    """
+    flat_indices = np.argsort(roi.ravel(), kind="stable")[::-1]
+    roi_coords = np.array(np.unravel_index(flat_indices, roi.shape)).T
+    picked = []
+    for row, col in roi_coords:
+        center_y, center_x = y0 + row + half, x0 + col + half
+        if all(np.hypot(py - center_y, px - center_x) >= min_dist for px, py in picked):
+            picked.append((int(center_x), int(center_y)))
+            if len(picked) >= top_k:
+                break
+    return picked
+
+
+def check_nms(
+    w, pre: np.ndarray, post: np.ndarray, name: str, window: int = 99, roi: tuple[float, float] = (0.2, 0.8)
+) -> None:
+    """
+    _pick_separated_peaks must pick exactly the centers reference_nms picks from the same
+    score map (roi band of window positions), for a few top_k / min_dist settings.
+    """
+    h_ws, w_ws = pre.shape[0] - window + 1, pre.shape[1] - window + 1
+    y0, y1 = int(h_ws * roi[0]), int(h_ws * roi[1])
+    x0, x1 = int(w_ws * roi[0]), int(w_ws * roi[1])
+    roi = w._score_map(pre, post, window)[y0:y1, x0:x1].copy()
+    for top_k, min_dist in ((20, 99), (5, 40)):
+        expected = reference_nms(roi, x0, y0, window // 2, top_k, min_dist)
+        got = w._pick_separated_peaks(roi, x0, y0, window // 2, top_k, min_dist)
+        if got != expected:
+            raise AssertionError(f"NMS differs from the reference at {name}, top_k={top_k}, min_dist={min_dist}")
+
+
+def bench_validate(repeat: int = 3, lines: int = 100_000) -> dict:
+    """
+    Seconds for validate_smiles per 100k SMILES, on drug-like molecules, on a long
+    (112-character) taxane and on the mixed set with broken lines. Every valid line takes
+    the fast path; its cost grows with length, so the target (under 1 s) is for drug-like
+    lines of 20-40 characters, and the taxane is expected at about 1.5x that.
+    """
+    from smiles_tools import validate_smiles
+
+    corpora = {
+        "validate_100k": DRUG_SMILES,
+        "validate_100k_long": [SAMPLE_SMILES[2]],
+        "validate_100k_mixed": VALIDATION_SMILES,
+    }
+    results = {}
+    for name, smiles in corpora.items():
+        corpus = (smiles * (lines // len(smiles) + 1))[:lines]
+        results[name] = best_of(lambda: [validate_smiles(s) for s in corpus], repeat) * 100_000 / lines
+    return results
+
+
+def import_report(module: str) -> dict:
+    """
+    Import module in a fresh interpreter: {"seconds", "loaded": top-level modules}, or
+    {"missing": name} if one of its own dependencies is not installed.
+    """
+    probe = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE.format(module=module)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(probe.stdout)
+
+
+def bench_imports(repeat: int = 3) -> dict:
+    """
+    Seconds to import each entry point in a fresh interpreter (best of `repeat`), checked
+    against the budgets in IMPORT_BUDGETS (test_checks.py checks the forbidden modules).
+    Entry points whose own dependencies are not installed here (PyQt6 off macOS) are skipped.
+    """
+    results = {}
+    for module, (budget, _) in IMPORT_BUDGETS.items():
+        best = None
+        for _ in range(repeat):
+            report = import_report(module)
+            if "missing" in report:
+                print(f"imports.{module}: skipped, {report['missing']} is not installed", file=sys.stderr)
+                break
+            best = report["seconds"] if best is None else min(best, report["seconds"])
+        if best is None:
+            continue
+        if best > budget:
+            raise AssertionError(f"import {module} takes {best * 1000:.0f} ms, budget {budget * 1000:.0f} ms")
+        results[module] = best
+    return results
+
+
+def _stage_of_keys(keys: list[str]) -> str:
+    combo = frozenset(k.lower() for k in keys)
+    if combo == frozenset(("command", "v")):
+        return "paste"
+    if combo == frozenset(("option", "command", "n")):
+        return "start"
+    if combo == frozenset(("command", "c")):
+        return "copy_keys"
+    return "clear"
+
+
+def timed_worker_class(base):
+    """
+    Subclass a chem_draw worker so every primitive it uses is timed per stage.
+    Whatever draw_chem spends outside these primitives is the readiness waiting.
+    """
+
+    class timed(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.stage_times = defaultdict(float)
+
+        def _timed(self, stage, fn, *args):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.stage_times[stage] += time.perf_counter() - t0
+
+        def capture_gray(self, label=""):
+            return self._timed("capture", super().capture_gray, label)
+
+        def find_max_diff_centers(self, *args, **kwargs):
+            return self._timed("scoring", lambda: super(timed, self).find_max_diff_centers(*args, **kwargs))
+
+        def move_and_click(self, x, y):
+            return self._timed("click", super().move_and_click, x, y)
+
+        def press_keys(self, keys):
+            return self._timed(_stage_of_keys(keys), super().press_keys, keys)
+
+        def write_to_clipboard(self, text):
+            return self._timed("clipboard", super().write_to_clipboard, text)
+
+        def get_clipboard_text(self):
+            return self._timed("clipboard", super().get_clipboard_text)
+
+        def get_clipboard_change_count(self):
+            return self._timed("clipboard", super().get_clipboard_change_count)
+
+    return timed
+
+
+def bench_pipeline(molecules: int = 4, width: int = 1920, height: int = 1080) -> dict:
+    """
+    Per-stage seconds per molecule of draw_chem and draw_chem_split on the simulated
+    backend (default simulated latencies). "wait" is time spent in readiness polling.
+    """
+    from chem_draw import chem_draw_worker, chem_draw_worker_split
+    from simulated import simulated_backend
+
+    results = {}
+    for label, base, method, inputs in (
+        ("draw_chem", chem_draw_worker, "draw_chem", SAMPLE_SMILES),
+        ("draw_chem_split", chem_draw_worker_split, "draw_chem_split", SAMPLE_SPLIT_SMILES),
+    ):
+        w = timed_worker_class(base)(simulated_backend(width=width, height=height))
+        w.log_keys = False
+        total = 0.0
+        for i in range(molecules):
+            t0 = time.perf_counter()
+            getattr(w, method)(inputs[i % len(inputs)])
+            total += time.perf_counter() - t0
+        stages = {k: v / molecules for k, v in w.stage_times.items()}
+        stages["wait"] = total / molecules - sum(stages.values())
+        stages["total"] = total / molecules
+        results[label] = stages
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for k, v in results.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            flat.update(flatten(v, key + "."))
+        else:
+            flat[key] = v
+    return flat
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.time(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def format_metric(key: str, value: float) -> str:
+    if key.endswith("_mb"):
+        return f"{value:.2f} MB"
+    return f"{value * 1000:.2f} ms"
+
+
+def compare(current: dict, baseline: dict, tolerance: float, floor: float = 0.002) -> list[str]:
+    """
+    Metrics that got slower (or, for *_mb, bigger) than baseline * (1 + tolerance);
+    timings below `floor` seconds are ignored as noise.
+    """
+    regressions = []
+    for key, old in baseline.items():
+        new = current.get(key)
+        if new is None or old is None:
+            continue
+        if max(new, old) < floor:
+            continue
+        if new > old * (1.0 + tolerance):
+            regressions.append(f"{key}: {format_metric(key, old)} -> {format_metric(key, new)}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage benchmarks for the capture/scoring/conversion path.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--molecules", type=int, default=4)
+    parser.add_argument("--only", choices=("gray", "scoring", "validate", "pipeline", "imports"), action="append",
+                        help="run only these suites (repeatable)")
+    parser.add_argument(
+        "--frames", help="session_recorder directory: check NMS and pyramid on every recorded pair, time the first"
+    )
+    parser.add_argument("--out", help="write results as JSON (compare across commits)")
+    parser.add_argument("--baseline", help="results JSON from an earlier run; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown per metric")
+    args = parser.parse_args()
+
+    suites = args.only or ["gray", "scoring", "validate", "pipeline", "imports"]
+    results = {}
+    if "gray" in suites:
+        results["gray"] = bench_gray(args.repeat)
+    if "scoring" in suites:
+        results["scoring"] = bench_scoring(args.repeat, args.frames)
+    if "validate" in suites:
+        results["validate"] = bench_validate(args.repeat)
+    if "pipeline" in suites:
+        results["pipeline"] = bench_pipeline(args.molecules)
+    if "imports" in suites:
+        results["imports"] = bench_imports(args.repeat)
+
+    metrics = flatten(results)
+    for key, value in metrics.items():
+        print(f"{key:45s} {format_metric(key, value):>13s}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"meta": metadata(), "metrics": metrics}, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(metrics, baseline, args.tolerance)
+        if regressions:
+            print("regressions beyond tolerance:", file=sys.stderr)
+            for line in regressions:
+                print("  " + line, file=sys.stderr)
+            sys.exit(1)
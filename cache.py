@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "AUTOSMILES_CACHE",
+    os.path.join(os.path.expanduser("~"), ".autosmiles2iupac", "cache.sqlite3"),
+)
+
+
+class result_cache:
+    def __init__(
+        self,
+        path: str | None = None,
+        max_entries: int = 1_000_000,
+        max_age_days: float | None = 180,
+        enabled: bool = True,
+    ):
+        """
+        Disk-backed SMILES -> IUPAC name cache (SQLite), keyed by (smiles, mode).
+        mode 是 "plain"（run.py）或 "split"（run_split.py，惰性气体替换断键）。
+        enabled=False 时所有查询都视为未命中，也不写入。
+        可以在多个线程间共享（pipeline.staged_convert 在预处理线程查询、在写出线程写入）。
+        """
+        self.path = path or DEFAULT_CACHE_PATH
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_evict = 0
+        self._conn = None
+        self._lock = threading.Lock()
+        if not enabled:
+            return
+
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                smiles TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                iupac_name TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (smiles, mode)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.evict()
+
+    def get(self, smiles: str, mode: str = "plain") -> str | None:
+        """
+        Return the cached name, or None on a miss (or when the cache is disabled).
+        """
+        with self._lock:
+            return self._get(smiles, mode)
+
+    def _get(self, smiles: str, mode: str) -> str | None:
+        if self._conn is None:
+            self.misses += 1
+            return None
+        row = self._conn.execute(
+            "SELECT iupac_name, created FROM results WHERE smiles = ? AND mode = ?",
+            (smiles, mode),
+        ).fetchone()
+        now = time.time()
+        if row is None or self._expired(row[1], now):
+            self.misses += 1
+            return None
+        self._conn.execute(
+            "UPDATE results SET last_used = ? WHERE smiles = ? AND mode = ?",
+            (now, smiles, mode),
+        )
+        self.hits += 1
+        return row[0]
+
+    def put(self, smiles: str, iupac_name: str, mode: str = "plain") -> None:
+        """
+        Store a converted name. Fallthrough results (name == input) are not cached.
+        """
+        with self._lock:
+            self._put(smiles, iupac_name, mode)
+
+    def _put(self, smiles: str, iupac_name: str, mode: str) -> None:
+        if self._conn is None or not iupac_name or iupac_name == smiles:
+            return
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (smiles, mode, iupac_name, created, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (smiles, mode, iupac_name, now, now),
+        )
+        self._puts_since_evict += 1
+        if self._puts_since_evict >= 1000:
+            self._evict()
+
+    def evict(self) -> None:
+        """
+        Drop entries older than max_age_days, then the least recently used ones beyond max_entries.
+        """
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        if self._conn is None:
+            return
+        self._puts_since_evict = 0
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            self._conn.execute("DELETE FROM results WHERE created < ?", (cutoff,))
+        if self.max_entries is not None:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM results WHERE rowid IN "
+                    "(SELECT rowid FROM results ORDER BY last_used ASC LIMIT ?)",
+                    (excess,),
+                )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.max_age_days is not None and now - created > self.max_age_days * 86400
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
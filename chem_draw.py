@@ -0,0 +1,417 @@
+from utils import *
+import re
+import time
+
+from pipeline import conversion_failed
+from readiness import frames_differ, wait_for_settle, wait_until
+from tracing import null_tracer
+
+class chem_draw_worker(worker):
+    def __init__(self, backend: backend | None = None):
+        super().__init__(backend)
+        self.p_img = None
+        self.pre_img = None
+        self.post_img = None
+        self.cap = 5
+        # Readiness timeouts (seconds): each wait returns as soon as its condition holds.
+        # The defaults are the fixed sleeps they replaced (1 s after paste and after the
+        # name command, 0.5 s between click and copy), so nothing waits longer than it
+        # used to; cli.py's --paste-timeout/--start-timeout/--click-delay tighten them
+        # once they are measured on a given machine.
+        self.paste_timeout = 1.0
+        self.start_timeout = 1.0
+        self.copy_timeout = 0.5
+        self.click_delay = 0.5
+        self.click_offsets = (0, -20, 20)
+        # Seconds per molecule before the click loop gives up (None: try every candidate).
+        self.time_budget = 20.0
+        # Why the last draw_chem returned its input: None, "no_render_diff",
+        # "clipboard_unchanged", "name_equals_input" or "timeout".
+        self.last_failure = None
+        # The same per input of the last draw_chem_batch.
+        self.last_failures: list[str | None] = []
+        self.tracer = null_tracer()
+        # Optional click_prior.click_prior: tries historically successful (rank, offset) first.
+        self.click_prior = None
+        # Optional recording.session_recorder: keeps frames, candidates and clicks for replay.py.
+        self.recorder = None
+
+    def copy_at(self, x: int, y: int) -> str | None:
+        """
+        Click (x, y) and copy. Returns the clipboard text, or None if the
+        pasteboard did not change (nothing was selected).
+        """
+        with self.tracer.stage("click"):
+            self.move_and_click(x, y)
+            time.sleep(self.click_delay)
+        with self.tracer.stage("copy_wait"):
+            count = self.get_clipboard_change_count()
+            self.press_keys(self.copyKey)
+            if not wait_until(lambda: self.get_clipboard_change_count() != count, self.copy_timeout):
+                return None
+        with self.tracer.stage("clipboard_read"):
+            return self.get_clipboard_text()
+
+    def find_candidate_points(
+        self, pre_img: np.ndarray, post_img: np.ndarray, top_k: int = 20
+    ) -> list[Tuple[int, int]]:
+        """
+        find_max_diff_centers on frames from capture_gray, returned in full-display pixels.
+        A cropped frame is searched in full, since the crop already is the search area.
+        """
+        if self.resolved_capture_region() is None:
+            return self.find_max_diff_centers(pre_img, post_img, top_k=top_k)
+        ox, oy = self.capture_origin
+        points = self.find_max_diff_centers(pre_img, post_img, top_k=top_k, roi=(0.0, 1.0))
+        return [(x + ox, y + oy) for x, y in points]
+
+    def paste_and_name(self, smiles: str, top_k: int = 20) -> list[Tuple[int, int]]:
+        """
+        Paste smiles, run the name command and return the candidate points of the new text.
+        """
+        tracer = self.tracer
+        with tracer.stage("paste"):
+            self.write_to_clipboard(smiles)
+            # Only consumed as the readiness baseline for the paste.
+            self.p_img = self.capture_gray("beforepaste")
+            # print(self.get_clipboard_text())
+            self.press_keys(self.pasteKey)
+        with tracer.stage("render_wait"):
+            self.pre_img, _ = wait_for_settle(
+                lambda: self.capture_gray("afterpaste"),
+                baseline=self.p_img,
+                timeout=self.paste_timeout,
+            )
+        with tracer.stage("name_wait"):
+            self.press_keys(self.startKey)
+            self.post_img, _ = wait_for_settle(
+                lambda: self.capture_gray("afterstart"),
+                baseline=self.pre_img,
+                timeout=self.start_timeout,
+            )
+        with tracer.stage("scoring"):
+            points = self.find_candidate_points(self.pre_img, self.post_img, top_k=top_k)
+        tracer.count("candidates", len(points))
+        return points
+
+    def clear_canvas(self) -> None:
+        with self.tracer.stage("clear"):
+            self.press_keys(["command", "a"])
+            self.press_keys(["backspace"])
+
+    def draw_chem(self, smiles: str) -> None:
+        """
+        Draw the given chemical formula.
+        """
+        tracer = self.tracer
+        tracer.begin(smiles)
+        deadline = None if self.time_budget is None else time.monotonic() + self.time_budget
+        points = self.paste_and_name(smiles)
+        
+        iupac_name = smiles
+        failure = None
+        candidates = points
+        clicks = [] if self.recorder is not None else None
+        if not points or not frames_differ(self.pre_img, self.post_img):
+            # Nothing was named: every candidate would be noise.
+            failure = "no_render_diff"
+            points = []
+        attempts = [(rank, offset) for rank in range(len(points)) for offset in self.click_offsets]
+        if self.click_prior is not None:
+            attempts = self.click_prior.order(attempts)
+        copied_any = False
+        for rank, offset in attempts:
+            if deadline is not None and time.monotonic() > deadline:
+                failure = "timeout"
+                break
+            tracer.count("attempts")
+            copied = self.copy_at(points[rank][0], points[rank][1] + offset)
+            if clicks is not None:
+                clicks.append({"rank": rank, "offset": offset, "copied": copied})
+            if copied is None:
+                continue
+            copied_any = True
+            if copied != smiles:
+                iupac_name = copied
+                tracer.note("rank", rank)
+                tracer.note("offset", offset)
+                if self.click_prior is not None:
+                    self.click_prior.record(rank, offset)
+                break
+        else:
+            if failure is None:
+                failure = "name_equals_input" if copied_any else "clipboard_unchanged"
+        
+        self.clear_canvas()
+        self.last_failure = failure
+        tracer.end(failure or "success")
+        if self.recorder is not None:
+            self.recorder.record(
+                smiles, self.pre_img, self.post_img, self.capture_origin,
+                self.resolved_capture_region() is not None, candidates, clicks,
+                self.click_offsets, failure or "success", iupac_name,
+            )
+        return iupac_name
+
+    def convert(self, smiles: str) -> str:
+        """
+        draw_chem that raises pipeline.conversion_failed instead of returning the input.
+        """
+        try:
+            iupac_name = self.draw_chem(smiles)
+        except Exception:
+            # Leave a clean canvas for the next molecule.
+            self.clear_canvas()
+            raise
+        if self.last_failure is not None:
+            raise conversion_failed(self.last_failure)
+        return iupac_name
+
+    def slow_down(self, factor: float = 2.0) -> None:
+        """
+        Scale every wait (and the time budget) for a retry pass over hard molecules.
+        """
+        self.paste_timeout *= factor
+        self.start_timeout *= factor
+        self.copy_timeout *= factor
+        self.click_delay *= factor
+        if self.time_budget is not None:
+            self.time_budget *= factor
+
+    def draw_chem_batch(self, smiles_list: list[str]) -> list[str]:
+        """
+        Convert several molecules with one paste (dot-separated fragments), one name
+        command and one clear. ChemDraw lays the fragments out left to right, each name
+        under its structure, so distinct names found at the candidate points are matched
+        to the inputs by x position. If not exactly one name per input is found the
+        batch falls back to draw_chem per molecule. Inputs that already contain "."
+        (salts, mixtures) are always converted one at a time.
+        self.last_failures gets the failure class of each input (None if named), as
+        last_failure does for draw_chem.
+        """
+        unique = list(dict.fromkeys(smiles_list))
+        single = [s for s in unique if "." in s]
+        batch = [s for s in unique if "." not in s]
+        names: dict[str, str] = {}
+        failures: dict[str, str | None] = {}
+        if len(batch) > 1:
+            names.update(self._draw_fragments(batch, failures))
+        elif batch:
+            single.extend(batch)
+        for smiles in single:
+            if smiles not in names:
+                names[smiles] = self.draw_chem(smiles)
+                failures[smiles] = self.last_failure
+        self.last_failures = [failures[s] for s in smiles_list]
+        return [names[s] for s in smiles_list]
+
+    def _draw_fragments(self, batch: list[str], failures: dict[str, str | None]) -> dict[str, str]:
+        tracer = self.tracer
+        tracer.begin(".".join(batch))
+        tracer.note("batch", len(batch))
+        # time_budget is per molecule, so the batch gets one per fragment.
+        deadline = None if self.time_budget is None else time.monotonic() + self.time_budget * len(batch)
+        points = self.paste_and_name(".".join(batch), top_k=max(20, 4 * len(batch)))
+
+        found: dict[str, int] = {}  # name -> x of the point that copied it
+        named: set[int] = set()  # ranks whose name was copied: their other offsets are skipped
+        attempts = [(rank, offset) for rank in range(len(points)) for offset in self.click_offsets]
+        if self.click_prior is not None:
+            # Learned per batch size: the names' ranks depend on how many there are.
+            attempts = self.click_prior.order(attempts, group=len(batch))
+        outcome = "batch_incomplete"
+        for rank, offset in attempts:
+            if len(found) == len(batch):
+                break
+            if rank in named:
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                outcome = "timeout"
+                break
+            tracer.count("attempts")
+            copied = self.copy_at(points[rank][0], points[rank][1] + offset)
+            if copied and copied not in batch:
+                named.add(rank)
+                if copied not in found:
+                    found[copied] = points[rank][0]
+                    if self.click_prior is not None:
+                        self.click_prior.record(rank, offset, group=len(batch))
+        self.clear_canvas()
+
+        if len(found) != len(batch):
+            tracer.end(outcome)
+            names = {}
+            for smiles in batch:
+                names[smiles] = self.draw_chem(smiles)
+                failures[smiles] = self.last_failure
+            return names
+        tracer.end("success")
+        failures.update(dict.fromkeys(batch))
+        by_x = sorted(found, key=found.get)
+        return dict(zip(batch, by_x))
+
+    def convert_many(self, smiles_list: list[str]) -> list[tuple[str | None, str | None]]:
+        """
+        draw_chem_batch with an outcome per input, as pipeline.attempt gives it for convert:
+        (name, None) or (None, failure class).
+        """
+        try:
+            names = self.draw_chem_batch(smiles_list)
+        except Exception:
+            # Leave a clean canvas for the next batch.
+            self.clear_canvas()
+            raise
+        return [
+            (name, None) if failure is None else (None, failure)
+            for name, failure in zip(names, self.last_failures)
+        ]
+
+
+# "*", "[*]" or a labelled "[*:n]" attachment point.
+ATTACHMENT_RE = re.compile(r"\[\*(?::(\d+))?\]|\*")
+# Element symbols written in bracket atoms, e.g. "Ne" in "[22Ne+]".
+_BRACKET_SYMBOL_RE = re.compile(r"\[\d*([A-Z][a-z]?)")
+
+
+class chem_draw_worker_split(chem_draw_worker):
+    def __init__(self, backend: backend | None = None):
+        super().__init__(backend)
+        self.p_img = None
+        self.pre_img = None
+        self.post_img = None
+        self.cap = 5
+        self.inert_gases = {
+            "He": ["Helium",
+                   "helium",
+                   "Helio",
+                   "helio"],
+            "Ne": ["Neon",
+                   "neon",
+                   "Neio",
+                   "neio"],
+            "Ar": ["Argon",
+                   "argon",
+                   "Argio",
+                   "argio"],
+            "Kr": ["Krypton",
+                   "krypton",
+                   "Kryptio",
+                   "kryptio"],
+            "Xe": ["Xenon",
+                   "xenon",
+                   "Xenio",
+                   "xenio"],
+            "Rn": ["Radon",
+                   "radon",
+                   "Radonio",
+                   "radonio"],
+        }
+        self.placeholder = "[Chemical_bond]"
+        # (gas, placeholder) pairs -> compiled reverse substitution
+        self._restore_res: dict[tuple, tuple[re.Pattern, dict[str, str]]] = {}
+    
+    def find_inert_gas(self, smiles: str) -> str:
+        for gas, names in self.inert_gases.items():
+            if gas not in smiles and gas.lower() not in smiles.lower():
+                return gas
+        # impossible to have all inert gases in the same molecule
+
+    def free_gases(self, smiles_list: list[str]) -> list[str]:
+        """
+        Inert gases that occur in none of the molecules, in preference order.
+        convert_split_many computes it once per batch; streamed (staged) runs see one
+        molecule at a time, so there prepare_split scans each molecule on its own.
+        """
+        used = set()
+        for smiles in smiles_list:
+            used.update(_BRACKET_SYMBOL_RE.findall(smiles))
+        return [gas for gas in self.inert_gases if gas not in used]
+
+    def numbered_placeholder(self, label: str | None) -> str:
+        if label is None:
+            return self.placeholder
+        return f"{self.placeholder[:-1]}:{label}]"
+        
+    def draw_chem_split(self, org_smiles: str) -> None:
+        """
+        Draw the given chemical formula.
+        """
+        new_smiles, gases = self.prepare_split(org_smiles)
+        
+        iupac_name = self.draw_chem(new_smiles)
+        
+        return self.restore_placeholder(iupac_name, gases)
+
+    def convert_split(self, org_smiles: str) -> str:
+        """
+        draw_chem_split that raises pipeline.conversion_failed instead of returning the input.
+        """
+        new_smiles, gases = self.prepare_split(org_smiles)
+        return self.restore_placeholder(self.convert(new_smiles), gases)
+
+    def prepare_split(self, org_smiles: str, free: list[str] | None = None) -> tuple[str, tuple]:
+        """
+        Replace the attachment points with inert gases absent from the molecule, in one
+        pass: every "[*:n]" label gets its own gas, all unlabelled "*" share one. So a
+        fragment with several attachment points still takes one ChemDraw round trip.
+        free: precomputed free_gases() of the batch (convert_split_many only); when None,
+        as in staged_convert, the molecule's own free gases are found with one regex scan.
+        Returns (smiles to draw, context for restore_placeholder): the (gas, placeholder)
+        pairs used.
+        """
+        if free is None:
+            free = self.free_gases([org_smiles])
+        labels = list(dict.fromkeys(m.group(1) for m in ATTACHMENT_RE.finditer(org_smiles)))
+        if len(labels) > len(free):
+            # More distinct attachment points than free gases: fall back to one shared gas.
+            gas = free[0] if free else self.find_inert_gas(org_smiles)
+            return ATTACHMENT_RE.sub(f"[{gas}]", org_smiles), ((gas, self.placeholder),)
+        gas_of = dict(zip(labels, free))
+        new_smiles = ATTACHMENT_RE.sub(lambda m: f"[{gas_of[m.group(1)]}]", org_smiles)
+        return new_smiles, tuple((gas, self.numbered_placeholder(label)) for label, gas in gas_of.items())
+
+    def restore_placeholder(self, iupac_name: str, gases: tuple | str) -> str:
+        """
+        Turn every spelling of the substituted gases back into its placeholder with one
+        compiled regex. gases: the context from prepare_split (or a single gas symbol).
+        """
+        if isinstance(gases, str):
+            gases = ((gases, self.placeholder),)
+        if not gases:
+            return iupac_name
+        compiled = self._restore_res.get(gases)
+        if compiled is None:
+            replacement = {
+                spelling: placeholder
+                for gas, placeholder in gases
+                for spelling in self.inert_gases[gas]
+            }
+            # Longest spelling first, so "Helium" wins over "Helio".
+            pattern = re.compile("|".join(
+                re.escape(spelling) for spelling in sorted(replacement, key=len, reverse=True)
+            ))
+            compiled = self._restore_res[gases] = (pattern, replacement)
+        pattern, replacement = compiled
+        return pattern.sub(lambda m: replacement[m.group(0)], iupac_name)
+
+    def convert_split_many(self, smiles_list: list[str]) -> list[tuple[str | None, str | None]]:
+        """
+        convert_many for split-mode inputs. Success is judged on the gas-substituted text
+        ChemDraw saw, before the placeholders are restored.
+        """
+        free = self.free_gases(smiles_list)
+        prepared = [self.prepare_split(smiles, free) for smiles in smiles_list]
+        outcomes = self.convert_many([new_smiles for new_smiles, _ in prepared])
+        return [
+            (self.restore_placeholder(name, gases), None) if failure is None else (None, failure)
+            for (name, failure), (_, gases) in zip(outcomes, prepared)
+        ]
+
+
+def wait_until_space_up(is_pressed=is_space_pressed):
+    """
+    Block until the space bar is released (if currently pressed).
+    Uses Quartz key state so it does not require sudo (only normal Accessibility).
+    """
+    while not is_pressed():
+        time.sleep(0.01)
@@ -0,0 +1,190 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+
+from archive import DEFAULT_ARCHIVE_PATH, result_archive
+from cache import DEFAULT_CACHE_PATH, result_cache
+from output import result_writer
+from pipeline import convert_stream, iter_smiles, staged_convert
+
+
+def parse_region(value: str):
+    """
+    "auto", "full" or "left,top,width,height" (pixels) -> worker.capture_region.
+    """
+    if value == "auto":
+        return "auto"
+    if value == "full":
+        return None
+    parts = value.split(",")
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError("expected auto, full or left,top,width,height")
+    return tuple(int(p) for p in parts)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="SMILES -> IUPAC name via ChemDraw, without the Qt window.",
+    )
+    parser.add_argument("-i", "--input", default="-", help="smiles 文件，每行一个；- 表示 stdin（默认）")
+    parser.add_argument(
+        "-o", "--output", default="-",
+        help="- 表示逐行输出 JSONL 到 stdout（默认）；否则写入与界面相同格式的 JSON 文件",
+    )
+    parser.add_argument("--mode", choices=("plain", "split"), default="plain",
+                        help="split: 含 * 断键的 smiles（同 run_split.py）")
+    parser.add_argument("--limit", type=int, default=None, help="最多转换多少行")
+    parser.add_argument("--resume", action="store_true", help="跳过 OUTPUT.partial 中已完成的条目")
+    parser.add_argument("--no-cache", action="store_true", help="忽略结果缓存")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--archive", nargs="?", const=DEFAULT_ARCHIVE_PATH, default=None,
+                        help=f"同时把结果记入可索引的归档（SQLite，默认 {DEFAULT_ARCHIVE_PATH}），见 archive.py")
+    parser.add_argument("--wait-space", action="store_true", help="开始前等待按下空格（同界面）")
+    parser.add_argument("--paste-timeout", type=float, default=1.0, help="粘贴后等待画面稳定的最长秒数")
+    parser.add_argument("--start-timeout", type=float, default=1.0, help="生成名称后等待画面稳定的最长秒数")
+    parser.add_argument("--copy-timeout", type=float, default=0.5)
+    parser.add_argument("--click-delay", type=float, default=0.5,
+                        help="点击与复制之间的等待秒数（界面响应快的机器上可调小）")
+    parser.add_argument("--no-validate", action="store_true",
+                        help="不做 SMILES 语法预检，所有行都交给 ChemDraw")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="一次粘贴到画布上的分子数（>1 时按从左到右的位置对应名称，失败则逐个重试）")
+    parser.add_argument("--time-budget", type=float, default=20.0,
+                        help="每个分子最多用多少秒点击候选位置（0 表示不限）")
+    parser.add_argument("--retries", type=int, default=1,
+                        help="失败的分子在全部处理完后用更慢的设置重试几次（0 关闭）")
+    parser.add_argument("--retry-slowdown", type=float, default=2.0,
+                        help="重试时各等待时间与时间预算的倍数")
+    parser.add_argument("--capture-region", type=parse_region, default="auto",
+                        help="auto、full 或 left,top,width,height（像素）")
+    parser.add_argument("--scoring-mode", choices=("exact", "pyramid"), default="exact",
+                        help="pyramid: 先在缩小的画面上找候选区域再按原分辨率细化（高分屏更快）")
+    parser.add_argument("--backend", choices=("macos", "simulated"), default="macos",
+                        help="simulated: 离线模拟的 ChemDraw，用于测试和基准")
+    parser.add_argument("--no-click-prior", action="store_true", help="不使用/不更新学习到的点击位置")
+    parser.add_argument("--click-prior-path", default=None)
+    parser.add_argument("--trace-jsonl", help="每个分子一条 trace 记录（JSONL）")
+    parser.add_argument("--record", metavar="DIR",
+                        help="记录每个分子的前后画面、候选点和点击结果到 DIR，供 replay.py 离线调参")
+    parser.add_argument("--metrics-prom", help="Prometheus textfile 指标输出路径")
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印发送的按键")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    # Platform modules are only needed once we actually drive ChemDraw.
+    from chem_draw import chem_draw_worker, chem_draw_worker_split, wait_until_space_up
+
+    if args.backend == "simulated":
+        from simulated import simulated_backend
+
+        backend = simulated_backend()
+    else:
+        backend = None
+    if args.mode == "split":
+        cdw = chem_draw_worker_split(backend)
+        convert = cdw.convert_split
+        convert_many = cdw.convert_split_many
+    else:
+        cdw = chem_draw_worker(backend)
+        convert = cdw.convert
+        convert_many = cdw.convert_many
+    cdw.paste_timeout = args.paste_timeout
+    cdw.start_timeout = args.start_timeout
+    cdw.copy_timeout = args.copy_timeout
+    cdw.click_delay = args.click_delay
+    cdw.capture_region = args.capture_region
+    cdw.scoring_mode = args.scoring_mode
+    cdw.time_budget = args.time_budget or None
+    cdw.log_keys = args.verbose
+    if not args.no_click_prior:
+        from click_prior import click_prior
+
+        cdw.click_prior = click_prior(args.click_prior_path)
+    if args.trace_jsonl or args.metrics_prom:
+        from tracing import tracer
+
+        cdw.tracer = tracer(jsonl_path=args.trace_jsonl, prom_path=args.metrics_prom)
+    if args.record:
+        from recording import session_recorder
+
+        cdw.recorder = session_recorder(args.record)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r")
+    archive = result_archive(args.archive) if args.archive else None
+    run = None
+    try:
+        smiles_iter = iter_smiles(source)
+        if args.output == "-":
+            writer = None
+        else:
+            writer = result_writer(args.output, resume=args.resume)
+            smiles_iter = writer.skip(smiles_iter)
+        if args.limit is not None:
+            smiles_iter = itertools.islice(smiles_iter, args.limit)
+
+        if args.wait_space:
+            print("切换到 ChemDraw 并按空格开始……", file=sys.stderr)
+            wait_until_space_up(cdw.is_space_pressed)
+
+        with result_cache(path=args.cache_path, enabled=not args.no_cache) as cache:
+            try:
+                if writer is None:
+                    def sink(record):
+                        sys.stdout.write(json.dumps(record) + "\n")
+                        sys.stdout.flush()
+
+                    def amend(index, record):
+                        sink({"amend": index, **record})
+                else:
+                    sink = writer.write
+                    amend = writer.amend
+                if archive is not None:
+                    run = archive.run_writer(None if args.input == "-" else os.path.abspath(args.input), args.mode)
+                    sink, amend = run.tee(sink, amend)
+                options = dict(
+                    mode=args.mode, cache=cache, validate=not args.no_validate,
+                    amend=amend, retries=args.retries,
+                    before_retry=lambda: cdw.slow_down(args.retry_slowdown),
+                )
+                if args.batch_size > 1:
+                    for record in convert_stream(
+                        smiles_iter, convert, convert_many=convert_many,
+                        batch_size=args.batch_size, **options,
+                    ):
+                        sink(record)
+                elif args.mode == "split":
+                    staged_convert(
+                        smiles_iter, cdw.convert, sink,
+                        prepare=cdw.prepare_split, finish=cdw.restore_placeholder, **options,
+                    )
+                else:
+                    staged_convert(smiles_iter, cdw.convert, sink, **options)
+            except BaseException:
+                if writer is not None:
+                    writer.close(compact=False)
+                raise
+            if writer is not None:
+                writer.close()
+            print(json.dumps(cache.stats()), file=sys.stderr)
+    finally:
+        cdw.tracer.close()
+        if cdw.click_prior is not None:
+            cdw.click_prior.close()
+        if cdw.recorder is not None:
+            cdw.recorder.close()
+        if run is not None:
+            run.close()
+        if archive is not None:
+            archive.close()
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import json
+import os
+
+DEFAULT_PRIOR_PATH = os.environ.get(
+    "AUTOSMILES_CLICK_PRIOR",
+    os.path.join(os.path.expanduser("~"), ".autosmiles2iupac", "click_prior.json"),
+)
+
+
+class click_prior:
+    def __init__(self, path: str | None = None, decay: float = 0.98, save_every: int = 10):
+        """
+        记录每次成功复制到名称时所用的 (候选点排名, 竖直偏移)，并按历史成功次数重排尝试顺序。
+        计数按 decay 指数衰减，窗口布局变化后能较快适应；结果持久化到 path（JSON）。
+        group 把不同的画布布局分开计数（例如一次粘贴的分子数），互不影响排序。
+        """
+        self.path = path or DEFAULT_PRIOR_PATH
+        self.decay = decay
+        self.save_every = save_every
+        self.scores: dict[tuple[int, ...], float] = {}
+        self._unsaved = 0
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    raw = json.load(f)
+                self.scores = {
+                    tuple(int(v) for v in key.split(",")): float(score)
+                    for key, score in raw.get("scores", {}).items()
+                }
+            except (OSError, ValueError):
+                # A corrupt prior only costs the learned ordering.
+                self.scores = {}
+
+    @staticmethod
+    def _key(rank: int, offset: int, group: int | None) -> tuple[int, ...]:
+        return (rank, offset) if group is None else (group, rank, offset)
+
+    def order(self, attempts: list[tuple[int, int]], group: int | None = None) -> list[tuple[int, int]]:
+        """
+        Sort (rank, offset) attempts by learned success, keeping the original order for ties.
+        """
+        if not self.scores:
+            return attempts
+        return sorted(attempts, key=lambda a: -self.scores.get(self._key(*a, group), 0.0))
+
+    def record(self, rank: int, offset: int, group: int | None = None) -> None:
+        for key in self.scores:
+            self.scores[key] *= self.decay
+        key = self._key(rank, offset, group)
+        self.scores[key] = self.scores.get(key, 0.0) + 1.0
+        self._unsaved += 1
+        if self._unsaved >= self.save_every:
+            self.save()
+
+    def save(self) -> None:
+        self._unsaved = 0
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"scores": {",".join(map(str, key)): s for key, s in self.scores.items()}}, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def close(self) -> None:
+        if self._unsaved:
+            self.save()
@@ -0,0 +1,358 @@
+import argparse
+import itertools
+import json
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Iterable, Iterator
+
+from archive import DEFAULT_ARCHIVE_PATH, result_archive
+from output import result_writer
+from pipeline import iter_smiles, result_record
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+
+
+def simulated_worker_cmd(*extra: str) -> list[str]:
+    """
+    A local cli.py worker driving the simulated ChemDraw (no cache, no click prior;
+    the simulator reacts at once, so the click delay is short).
+    """
+    return [
+        sys.executable, CLI_PATH, "-i", "-", "-o", "-",
+        "--backend", "simulated", "--no-cache", "--no-click-prior", "--retries", "0",
+        "--click-delay", "0.05", *extra,
+    ]
+
+
+class worker_process:
+    def __init__(self, cmd: list[str]):
+        """
+        One `cli.py -i - -o - --retries 0` process (local, or remote through e.g. ssh):
+        SMILES lines go to its stdin, one JSON record per line comes back on its stdout,
+        in order. Retries are the coordinator's job, on another worker.
+        """
+        self.cmd = cmd
+        self.proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+            start_new_session=True,
+        )
+
+    def convert(self, smiles_list: list[str]) -> Iterator[dict]:
+        """
+        Yield the record of each SMILES as it arrives. Raises EOFError if the process
+        died and ValueError if its output is out of step with the input.
+        The shard is written from a separate thread: a worker blocked on a full stdout
+        pipe stops reading its stdin, so writing it all before reading would deadlock.
+        """
+        feeder = threading.Thread(target=self._feed, args=(smiles_list,), daemon=True)
+        feeder.start()
+        for smiles in smiles_list:
+            line = self.proc.stdout.readline()
+            if not line:
+                raise EOFError(f"worker exited with {self.proc.poll()}")
+            record = json.loads(line)
+            if record.get("smiles") != smiles:
+                raise ValueError(f"worker answered {record.get('smiles')!r} for {smiles!r}")
+            yield record
+
+    def _feed(self, smiles_list: list[str]) -> None:
+        try:
+            for smiles in smiles_list:
+                self.proc.stdin.write(smiles + "\n")
+            self.proc.stdin.flush()
+        except (OSError, ValueError):
+            # The process died or was killed (or stdin closed); the reader reports it.
+            pass
+
+    def kill(self) -> None:
+        """
+        Kill the whole process group, so wrappers (sh, ssh) do not keep the pipes open.
+        """
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def close(self, timeout: float = 10.0) -> None:
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+            self.proc.wait()
+
+
+class shard_coordinator:
+    def __init__(
+        self,
+        worker_cmds: list[list[str]],
+        shard_size: int = 16,
+        max_retries: int = 2,
+        max_backlog: int | None = None,
+        item_timeout: float = 120.0,
+    ):
+        """
+        把输入切成 shard_size 条一组的分片，轮流分给 N 个 worker 进程（每个跑一个 ChemDraw）；
+        自己的队列空了的 worker 从最长的队列尾部“偷”分片。转换失败（返回输入本身）或 worker
+        崩溃的条目交给另一个 worker 重试，最多 max_retries 次；结果按输入顺序产出。
+        输入按需读取，已读未产出的条目不超过 max_backlog 条，内存不随输入增长。
+        一个 worker 超过 item_timeout 秒没有产出结果即视为卡死，杀掉进程，其条目交给别的 worker。
+        """
+        if not worker_cmds:
+            raise ValueError("at least one worker command is required")
+        self.worker_cmds = worker_cmds
+        self.shard_size = shard_size
+        self.max_retries = max_retries
+        self.max_backlog = max_backlog or shard_size * len(worker_cmds) * 8
+        self.item_timeout = item_timeout
+        self.stats = [
+            {"cmd": " ".join(cmd), "items": 0, "failed": 0, "stolen": 0, "crashed": False}
+            for cmd in worker_cmds
+        ]
+
+    # -- scheduling (all under self._cond) ------------------------------------
+
+    def _refill(self, wid: int) -> bool:
+        """
+        Read the next window of input and deal it round-robin over the live workers' queues.
+        """
+        if self._exhausted or self._read - self._emitted >= self.max_backlog:
+            return False
+        alive = sorted(self._alive, key=lambda w: (w - wid) % len(self._queues))
+        for n in range(len(alive) * 2):
+            shard = [
+                (self._read + i, smiles, 0, frozenset())
+                for i, smiles in enumerate(itertools.islice(self._input, self.shard_size))
+            ]
+            if not shard:
+                self._exhausted = True
+                break
+            self._read += len(shard)
+            self._queues[alive[n % len(alive)]].append(shard)
+        return True
+
+    def _take_retries(self, wid: int) -> list[tuple] | None:
+        batch = []
+        for item in list(self._retry):
+            # Prefer a worker that has not failed this item yet, unless none is left.
+            if wid not in item[3] or self._alive <= item[3]:
+                self._retry.remove(item)
+                batch.append(item)
+                if len(batch) >= self.shard_size:
+                    break
+        return batch or None
+
+    def _take(self, wid: int) -> list[tuple] | None:
+        with self._cond:
+            while not self._stop:
+                batch = self._take_retries(wid)
+                if batch is None and self._queues[wid]:
+                    batch = self._queues[wid].popleft()
+                if batch is None and self._refill(wid) and self._queues[wid]:
+                    batch = self._queues[wid].popleft()
+                if batch is None:
+                    victim = max(range(len(self._queues)), key=lambda w: len(self._queues[w]))
+                    if self._queues[victim]:
+                        batch = self._queues[victim].pop()
+                        self.stats[wid]["stolen"] += 1
+                if batch is not None:
+                    self._in_flight += len(batch)
+                    self._busy_since[wid] = time.monotonic()
+                    return batch
+                if self._exhausted and not self._in_flight and not self._retry:
+                    return None
+                self._cond.wait()
+            return None
+
+    def _finish(self, wid: int, item: tuple, record: dict | None) -> None:
+        """
+        Record one item's outcome; record None means the worker crashed on it.
+        """
+        index, smiles, tries, avoid = item
+        # Invalid SMILES fail the same way everywhere, so they are not retried.
+        ok = record is not None and (
+            "error" not in record or record["error"].startswith("invalid SMILES")
+        )
+        with self._cond:
+            self._in_flight -= 1
+            self._busy_since[wid] = time.monotonic()
+            self.stats[wid]["items"] += 1
+            if not ok:
+                self.stats[wid]["failed"] += 1
+            if ok or tries >= self.max_retries:
+                if record is None:
+                    record = result_record(smiles, None, tries + 1, "worker_crashed")
+                elif "attempts" in record:
+                    record["attempts"] = tries + 1
+                self._results[index] = record
+            else:
+                self._retry.append((index, smiles, tries + 1, avoid | {wid}))
+            self._cond.notify_all()
+
+    def _serve(self, wid: int, proc: worker_process) -> None:
+        try:
+            while True:
+                batch = self._take(wid)
+                if batch is None:
+                    return
+                done = 0
+                try:
+                    for item, record in zip(batch, proc.convert([item[1] for item in batch])):
+                        self._finish(wid, item, record)
+                        done += 1
+                    with self._cond:
+                        self._busy_since[wid] = None
+                except (OSError, ValueError, EOFError) as e:
+                    print(f"worker {wid} ({self.stats[wid]['cmd']}) failed: {e}", file=sys.stderr)
+                    with self._cond:
+                        self.stats[wid]["crashed"] = True
+                        self._alive.discard(wid)
+                        if not self._alive:
+                            self._error = RuntimeError("all workers failed")
+                    for item in batch[done:]:
+                        self._finish(wid, item, None)
+                    return
+        finally:
+            proc.close()
+            with self._cond:
+                self._alive.discard(wid)
+                self._busy_since[wid] = None
+                self._cond.notify_all()
+
+    # -- driver ---------------------------------------------------------------
+
+    def _kill_stuck(self, procs: list[worker_process]) -> None:
+        now = time.monotonic()
+        for wid, since in enumerate(self._busy_since):
+            if since is not None and now - since > self.item_timeout:
+                print(f"worker {wid} stuck for {now - since:.0f}s, killing it", file=sys.stderr)
+                self._busy_since[wid] = None
+                procs[wid].kill()
+
+    def run(self, smiles_iter: Iterable[str]) -> Iterator[dict]:
+        """
+        Yield {"smiles", "iupac_name"} per input line, in input order.
+        """
+        self._cond = threading.Condition()
+        self._input = iter(smiles_iter)
+        self._exhausted = False
+        self._read = 0
+        self._emitted = 0
+        self._queues = [deque() for _ in self.worker_cmds]
+        self._retry: deque[tuple] = deque()
+        self._results: dict[int, dict] = {}
+        self._in_flight = 0
+        self._alive = set(range(len(self.worker_cmds)))
+        self._stop = False
+        self._error = None
+        self._busy_since: list[float | None] = [None] * len(self.worker_cmds)
+
+        procs = [worker_process(cmd) for cmd in self.worker_cmds]
+        threads = [
+            threading.Thread(target=self._serve, args=(wid, proc), daemon=True)
+            for wid, proc in enumerate(procs)
+        ]
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                with self._cond:
+                    while self._emitted not in self._results:
+                        if self._error is not None:
+                            raise self._error
+                        if self._exhausted and self._emitted == self._read:
+                            return
+                        self._cond.wait(timeout=1.0)
+                        self._kill_stuck(procs)
+                    record = self._results.pop(self._emitted)
+                    self._emitted += 1
+                    self._cond.notify_all()
+                yield record
+        finally:
+            with self._cond:
+                self._stop = True
+                self._cond.notify_all()
+            for proc in procs:
+                proc.close(timeout=1.0)
+            for t in threads:
+                t.join()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Shard a SMILES file over several cli.py workers (one ChemDraw each).",
+    )
+    parser.add_argument("-i", "--input", default="-", help="smiles 文件，每行一个；- 表示 stdin（默认）")
+    parser.add_argument("-o", "--output", default="-", help="输出 JSON 文件；- 表示按行输出 JSONL 到 stdout（默认）")
+    parser.add_argument("--worker-cmd", action="append", default=[],
+                        help='启动一个 worker 的命令（可重复），例如 "ssh mini1 python autoSmiles/cli.py -i - -o - --retries 0"')
+    parser.add_argument("--simulated", type=int, default=0, help="另外启动 N 个模拟 ChemDraw 的本地 worker")
+    parser.add_argument("--shard-size", type=int, default=16)
+    parser.add_argument("--max-retries", type=int, default=2, help="失败条目换 worker 重试的次数")
+    parser.add_argument("--item-timeout", type=float, default=120.0,
+                        help="worker 超过这么多秒没有产出结果就杀掉并把条目交给别的 worker")
+    parser.add_argument("--resume", action="store_true", help="跳过 OUTPUT.partial 中已完成的条目")
+    parser.add_argument("--archive", nargs="?", const=DEFAULT_ARCHIVE_PATH, default=None,
+                        help="同时把结果记入可索引的归档（SQLite），见 archive.py")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    worker_cmds = [shlex.split(cmd) for cmd in args.worker_cmd]
+    worker_cmds += [simulated_worker_cmd() for _ in range(args.simulated)]
+    if not worker_cmds:
+        build_parser().error("give at least one --worker-cmd or --simulated N")
+
+    coordinator = shard_coordinator(
+        worker_cmds, shard_size=args.shard_size,
+        max_retries=args.max_retries, item_timeout=args.item_timeout,
+    )
+    source = sys.stdin if args.input == "-" else open(args.input, "r")
+    archive = result_archive(args.archive) if args.archive else None
+    run = None
+    try:
+        smiles_iter = iter_smiles(source)
+        writer = None if args.output == "-" else result_writer(args.output, resume=args.resume)
+        if writer is not None:
+            smiles_iter = writer.skip(smiles_iter)
+        if archive is not None:
+            run = archive.run_writer(None if args.input == "-" else os.path.abspath(args.input))
+        try:
+            for record in coordinator.run(smiles_iter):
+                if writer is None:
+                    sys.stdout.write(json.dumps(record) + "\n")
+                    sys.stdout.flush()
+                else:
+                    writer.write(record)
+                if run is not None:
+                    run.write(record)
+        except BaseException:
+            if writer is not None:
+                writer.close(compact=False)
+            raise
+        if writer is not None:
+            writer.close()
+        for wid, stats in enumerate(coordinator.stats):
+            print(json.dumps({"worker": wid, **stats}, ensure_ascii=False), file=sys.stderr)
+    finally:
+        if run is not None:
+            run.close()
+        if archive is not None:
+            archive.close()
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
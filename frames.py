@@ -0,0 +1,177 @@
+from typing import Callable, Tuple
+
+import numpy as np
+
+# (left, top, width, height) in screen pixels, origin at the top-left of the display.
+Region = Tuple[int, int, int, int]
+
+
+def detector_region(
+    frame_w: int,
+    frame_h: int,
+    window: int = 99,
+    roi: Tuple[float, float] = (0.2, 0.8),
+) -> Region:
+    """
+    The pixel rectangle that find_max_diff_centers actually reads for a full frame of
+    frame_w x frame_h: the roi band of window positions plus the window footprint.
+    Running the detector on this crop with roi=(0.0, 1.0) gives the same centers,
+    shifted by (left, top).
+    """
+    h_ws = frame_h - window + 1
+    w_ws = frame_w - window + 1
+    y0 = max(0, int(h_ws * roi[0]))
+    y1 = max(y0 + 1, int(h_ws * roi[1]))
+    x0 = max(0, int(w_ws * roi[0]))
+    x1 = max(x0 + 1, int(w_ws * roi[1]))
+    return x0, y0, (x1 - x0) + window - 1, (y1 - y0) + window - 1
+
+
+# ITU-R 601-2 luma in 16.16 fixed point, identical to PIL's convert("L").
+_LUMA_R, _LUMA_G, _LUMA_B = 19595, 38470, 7471
+
+_cv2 = False  # not tried yet
+
+
+def load_cv2():
+    """
+    OpenCV, imported on first use (it costs more start-up time than the rest of the
+    detector), or None if it is not installed.
+    """
+    global _cv2
+    if _cv2 is False:
+        try:
+            import cv2
+        except ImportError:  # numpy fallback in bgra_gray_converter reproduces PIL's convert("L") exactly
+            cv2 = None
+        _cv2 = cv2
+    return _cv2
+
+
+class bgra_gray_converter:
+    def __init__(self):
+        """
+        BGRA screen buffer -> grayscale uint8 without intermediate copies: the buffer is
+        viewed with np.frombuffer (row padding skipped via bytes_per_row) and converted by
+        OpenCV in one SIMD pass, or with NumPy integer luma when OpenCV is missing.
+        Scratch arrays are reused while the frame shape stays the same.
+        """
+        self.use_cv2 = load_cv2() is not None
+        self._scratch = {}
+
+    def _buffers(self, shape: Tuple[int, int], dtype) -> Tuple[np.ndarray, np.ndarray]:
+        key = (shape, np.dtype(dtype))
+        bufs = self._scratch.get(key)
+        if bufs is None:
+            bufs = (np.empty(shape, dtype=dtype), np.empty(shape, dtype=dtype))
+            self._scratch = {key: bufs}
+        return bufs
+
+    def convert(
+        self,
+        buf,
+        width: int,
+        height: int,
+        bytes_per_row: int,
+        downscale: int = 1,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Convert a BGRA buffer (anything exposing the buffer protocol) to a (H, W) uint8
+        array, or (H // downscale, W // downscale) when averaging downscale x downscale
+        blocks in the same pass. Writes into `out` when given, else into a new array.
+        """
+        if downscale < 1:
+            raise ValueError("downscale must be a positive integer.")
+        rows = np.frombuffer(buf, dtype=np.uint8, count=height * bytes_per_row)
+        bgra = rows.reshape(height, bytes_per_row)[:, :width * 4].reshape(height, width, 4)
+
+        if self.use_cv2:
+            cv2 = load_cv2()
+            if downscale == 1:
+                if out is None:
+                    out = np.empty((height, width), dtype=np.uint8)
+                return cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY, dst=out)
+            full, _ = self._buffers((height, width), np.uint8)
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY, dst=full)
+            oh, ow = height // downscale, width // downscale
+            if out is None:
+                out = np.empty((oh, ow), dtype=np.uint8)
+            return cv2.resize(full[:oh * downscale, :ow * downscale], (ow, oh), dst=out, interpolation=cv2.INTER_AREA)
+
+        if downscale == 1:
+            acc, tmp = self._buffers((height, width), np.uint32)
+            np.multiply(bgra[:, :, 2], _LUMA_R, out=acc, dtype=np.uint32)
+            np.multiply(bgra[:, :, 1], _LUMA_G, out=tmp, dtype=np.uint32)
+            acc += tmp
+            np.multiply(bgra[:, :, 0], _LUMA_B, out=tmp, dtype=np.uint32)
+            acc += tmp
+            acc += 0x8000
+            acc >>= 16
+        else:
+            k = downscale
+            oh, ow = height // k, width // k
+            blocks = bgra[:oh * k, :ow * k].reshape(oh, k, ow, k, 4)
+            acc, tmp = self._buffers((oh, ow), np.uint64)
+            np.sum(blocks[..., 2], axis=(1, 3), dtype=np.uint64, out=acc)
+            acc *= _LUMA_R
+            np.sum(blocks[..., 1], axis=(1, 3), dtype=np.uint64, out=tmp)
+            tmp *= _LUMA_G
+            acc += tmp
+            np.sum(blocks[..., 0], axis=(1, 3), dtype=np.uint64, out=tmp)
+            tmp *= _LUMA_B
+            acc += tmp
+            acc += (k * k) << 15
+            acc //= (k * k) << 16
+
+        if out is None:
+            out = np.empty(acc.shape, dtype=np.uint8)
+        np.copyto(out, acc, casting="unsafe")
+        return out
+
+
+class frame_source:
+    """
+    Where grayscale screen frames come from. grab() returns a uint8 (H, W) array in
+    screen-pixel space; with a region, only that rectangle is captured.
+    """
+
+    def size(self) -> Tuple[int, int]:
+        """
+        (width, height) of the full display in pixels.
+        """
+        raise NotImplementedError
+
+    def align(self, region: Region) -> Region:
+        """
+        Adjust a region to what this source can capture exactly; default is unchanged.
+        """
+        return region
+
+    def grab(self, region: Region | None = None) -> np.ndarray:
+        raise NotImplementedError
+
+
+class synthetic_frame_source(frame_source):
+    def __init__(self, frame: np.ndarray | Callable[[], np.ndarray]):
+        """
+        In-memory frame source: either a fixed array (replace it via .frame) or a
+        callable returning the current full frame. Counts grabs for tests/benchmarks.
+        """
+        self.frame = frame
+        self.grabs = 0
+
+    def _current(self) -> np.ndarray:
+        return self.frame() if callable(self.frame) else self.frame
+
+    def size(self) -> Tuple[int, int]:
+        h, w = self._current().shape[:2]
+        return w, h
+
+    def grab(self, region: Region | None = None) -> np.ndarray:
+        self.grabs += 1
+        frame = self._current()
+        if region is None:
+            return frame.copy()
+        left, top, width, height = region
+        return frame[top:top + height, left:left + width].copy()
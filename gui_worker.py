@@ -0,0 +1,217 @@
+import os
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtWidgets import (
+    QCheckBox,
+    QFileDialog,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QVBoxLayout,
+    QWidget,
+)
+
+from cache import result_cache
+from output import result_writer
+from pipeline import iter_smiles, progress_meter, run_control, staged_convert
+
+
+def format_progress(snapshot: dict) -> str:
+    """
+    One status line for the window: done/total, rate, ETA and rolling failure rate.
+    """
+    done, total = snapshot["done"], snapshot["total"]
+    text = f"{done}/{total}" if total is not None else f"{done}"
+    text += f"，{snapshot['per_minute']:.1f} 个/分钟"
+    if snapshot["eta"] is not None:
+        minutes, seconds = divmod(int(snapshot["eta"]), 60)
+        hours, minutes = divmod(minutes, 60)
+        text += f"，预计剩余 {hours}:{minutes:02d}:{seconds:02d}"
+    text += f"，最近失败率 {snapshot['failure_rate']:.0%}"
+    return text
+
+
+class conversion_thread(QThread):
+    # progress_meter.snapshot(), at most every progress_interval seconds and once at the end.
+    progress = pyqtSignal(dict)
+    # Message for the window once the run has ended (finished, cancelled or failed).
+    done = pyqtSignal(str)
+
+    def __init__(self, smiles_file: str, mode: str = "plain", use_cache: bool = True,
+                 resume: bool = False, progress_interval: float = 0.5, parent=None):
+        """
+        Run the whole batch of run.py / run_split.py off the GUI thread: wait for the
+        space bar, then staged_convert into {smiles_file}.json. control pauses or cancels
+        between molecules; a cancelled run keeps its .partial file for resume.
+        """
+        super().__init__(parent)
+        self.smiles_file = smiles_file
+        self.mode = mode
+        self.use_cache = use_cache
+        self.resume = resume
+        self.progress_interval = progress_interval
+        self.control = run_control()
+
+    def run(self):
+        try:
+            message = self._convert()
+        except Exception as exc:
+            message = f"出错: {exc}"
+        self.done.emit(message)
+
+    def _convert(self) -> str:
+        # The detector (numpy) and the macOS backend load here, on the worker thread,
+        # so the window opens without them.
+        from chem_draw import chem_draw_worker, chem_draw_worker_split, wait_until_space_up
+        from click_prior import click_prior
+        from utils import is_space_pressed
+
+        # Stop waits for the space bar too.
+        wait_until_space_up(lambda: self.control.cancelled or is_space_pressed())
+        if self.control.cancelled:
+            return "已停止"
+        if self.mode == "split":
+            cdw = chem_draw_worker_split()
+            # Inert gas substitution and its reversal run on the pipeline's helper threads.
+            options = dict(prepare=cdw.prepare_split, finish=cdw.restore_placeholder)
+        else:
+            cdw = chem_draw_worker()
+            options = {}
+        cdw.click_prior = click_prior()
+        output_path = f"{self.smiles_file}.json"
+        try:
+            with result_cache(enabled=self.use_cache) as cache, \
+                    result_writer(output_path, resume=self.resume) as writer:
+                total = sum(1 for _ in iter_smiles(self.smiles_file)) - writer.done
+                meter = progress_meter(total)
+                last_emit = 0.0
+
+                def sink(record: dict) -> None:
+                    nonlocal last_emit
+                    writer.write(record)
+                    meter.update(record)
+                    now = time.monotonic()
+                    if now - last_emit >= self.progress_interval:
+                        last_emit = now
+                        self.progress.emit(meter.snapshot())
+
+                smiles_iter = writer.skip(iter_smiles(self.smiles_file))
+                # Failed molecules are retried once at the end with doubled waits.
+                staged_convert(
+                    smiles_iter, cdw.convert, sink, mode=self.mode, cache=cache,
+                    amend=writer.amend, before_retry=cdw.slow_down, control=self.control, **options,
+                )
+                self.progress.emit(meter.snapshot())
+                stats = cache.stats()
+                cache_line = f"缓存命中 {stats['hits']}/{stats['hits'] + stats['misses']}"
+                if self.control.cancelled:
+                    writer.close(compact=False)
+                    return (f"已停止，完成 {writer.done} 条，部分结果在 {writer.partial_path}；"
+                            f"勾选“继续上次中断的任务”可继续（{cache_line}）")
+        finally:
+            cdw.click_prior.close()
+        return f"结果已保存至 {output_path}（{cache_line}）"
+
+
+class App(QWidget):
+    def __init__(self, mode: str = "plain", prompt: str = ""):
+        """
+        The window of run.py (mode "plain") and run_split.py (mode "split"); prompt is the
+        initial instruction shown above the file path.
+        """
+        super().__init__()
+        self.setWindowTitle("Auto IU2 SM")
+        self.resize(360, 220)
+
+        self.mode = mode
+        self.smiles_file = ""
+        self.conversion = None
+
+        layout = QVBoxLayout()
+        self.prompt = QLabel(prompt)
+        self.input = QLineEdit()
+        self.browse_btn = QPushButton("浏览...")
+        self.ignore_cache = QCheckBox("忽略缓存（重新转换所有条目）")
+        self.resume = QCheckBox("继续上次中断的任务（跳过已写入 .json.partial 的条目）")
+        self.submit_button = QPushButton("提交")
+        self.status = QLabel("")
+        self.pause_button = QPushButton("暂停")
+        self.stop_button = QPushButton("停止")
+        self.pause_button.setEnabled(False)
+        self.stop_button.setEnabled(False)
+        layout.addWidget(self.prompt)
+        layout.addWidget(self.input)
+        layout.addWidget(self.browse_btn)
+        layout.addWidget(self.ignore_cache)
+        layout.addWidget(self.resume)
+        layout.addWidget(self.submit_button)
+        layout.addWidget(self.status)
+        layout.addWidget(self.pause_button)
+        layout.addWidget(self.stop_button)
+        self.setLayout(layout)
+
+        self.browse_btn.clicked.connect(self.browse_file)
+        self.submit_button.clicked.connect(self.submit)
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.stop_button.clicked.connect(self.stop)
+
+    def browse_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "选择 smiles 文件", "", "Text Files (*.txt);;All Files (*)")
+        if file_path:
+            self.input.setText(file_path)
+
+    def submit(self):
+        self.smiles_file = self.input.text().strip()
+        if not self.smiles_file:
+            self.prompt.setText(f"请输入 smiles 文件路径。按下submit后切换回 ChemDraw，创建空白文档并按空格开始，结果将写入 {self.smiles_file}.json")
+            return
+        if not os.path.exists(self.smiles_file):
+            self.prompt.setText(f"文件不存在: {self.smiles_file}")
+            return
+
+        # The batch runs on a QThread; the window stays responsive and shows progress.
+        self.conversion = conversion_thread(
+            self.smiles_file, mode=self.mode,
+            use_cache=not self.ignore_cache.isChecked(), resume=self.resume.isChecked(),
+        )
+        self.conversion.progress.connect(lambda snapshot: self.status.setText(format_progress(snapshot)))
+        self.conversion.done.connect(self.run_done)
+        self.submit_button.setEnabled(False)
+        self.pause_button.setEnabled(True)
+        self.stop_button.setEnabled(True)
+        self.prompt.setText(f"请切换回 ChemDraw，空白文档按空格开始，结果将写入 {self.smiles_file}.json")
+        self.conversion.start()
+
+    def toggle_pause(self):
+        control = self.conversion.control
+        if control.paused:
+            control.resume()
+            self.pause_button.setText("暂停")
+        else:
+            # Takes effect before the next molecule.
+            control.pause()
+            self.pause_button.setText("继续")
+
+    def stop(self):
+        self.conversion.control.cancel()
+        self.pause_button.setEnabled(False)
+        self.stop_button.setEnabled(False)
+        self.prompt.setText("正在停止（当前分子完成后）……")
+
+    def run_done(self, message):
+        self.prompt.setText(message)
+        self.submit_button.setEnabled(True)
+        self.pause_button.setEnabled(False)
+        self.pause_button.setText("暂停")
+        self.stop_button.setEnabled(False)
+        self.conversion.wait()
+        self.conversion = None
+
+    def closeEvent(self, event):
+        # Closing mid-run: stop after the current molecule and wait for the thread, so the
+        # .partial file is flushed and Qt never destroys a running QThread.
+        if self.conversion is not None:
+            self.conversion.control.cancel()
+            self.conversion.wait()
+        super().closeEvent(event)
@@ -0,0 +1,266 @@
+from typing import Tuple
+
+import keyboard
+import numpy as np
+from Quartz import (
+    CGDataProviderCopyData,
+    CGDisplayBounds,
+    CGDisplayCreateImage,
+    CGDisplayCreateImageForRect,
+    CGDisplayRegisterReconfigurationCallback,
+    CGEventCreateKeyboardEvent,
+    CGEventCreateMouseEvent,
+    CGEventPost,
+    CGEventSetFlags,
+    CGEventSourceKeyState,
+    CGRectMake,
+    CGImageGetBytesPerRow,
+    CGImageGetDataProvider,
+    CGImageGetHeight,
+    CGImageGetWidth,
+    CGMainDisplayID,
+    CGWindowListCreateImage,
+    CGPoint,
+    kCGEventFlagMaskAlternate,
+    kCGEventFlagMaskCommand,
+    kCGEventFlagMaskControl,
+    kCGEventFlagMaskShift,
+    kCGEventLeftMouseDown,
+    kCGEventLeftMouseUp,
+    kCGEventMouseMoved,
+    kCGEventSourceStateHIDSystemState,
+    kCGHIDEventTap,
+    kCGMouseButtonLeft,
+    kCGNullWindowID,
+    kCGWindowImageDefault,
+    kCGWindowListOptionOnScreenOnly,
+)
+from AppKit import NSPasteboard, NSPasteboardTypeString
+
+from backends import backend
+from frames import Region, bgra_gray_converter, frame_source
+
+SPACE_KEYCODE = 49  # macOS virtual keycode for space
+KEYCODE_MAP = {
+    "c": 8,
+    "v": 9,
+    "n": 45,
+}
+
+def is_space_pressed() -> bool:
+    """
+    Return True if the space bar is currently held down (Quartz query, no sudo).
+    """
+    try:
+        return bool(CGEventSourceKeyState(kCGEventSourceStateHIDSystemState, SPACE_KEYCODE))
+    except Exception:
+        # Be resilient if Quartz is unavailable
+        return False
+
+
+def _send_keys_quartz(keys: list[str]) -> None:
+    """
+    Send a hotkey using Quartz (no sudo). Supports one main key + modifiers.
+    """
+    if not keys:
+        return
+
+    flags = 0
+    keycode = None
+    for k in keys:
+        lk = k.lower()
+        if lk in ("cmd", "command", "meta", "super"):
+            flags |= kCGEventFlagMaskCommand
+        elif lk in ("alt", "option", "opt"):
+            flags |= kCGEventFlagMaskAlternate
+        elif lk in ("ctrl", "control", "ctl"):
+            flags |= kCGEventFlagMaskControl
+        elif lk == "shift":
+            flags |= kCGEventFlagMaskShift
+        else:
+            if keycode is not None:
+                raise ValueError("Only one primary key supported in hotkey.")
+            keycode = KEYCODE_MAP.get(lk)
+
+    if keycode is None:
+        raise ValueError("No primary key specified for hotkey.")
+
+    down = CGEventCreateKeyboardEvent(None, keycode, True)
+    up = CGEventCreateKeyboardEvent(None, keycode, False)
+    if flags:
+        CGEventSetFlags(down, flags)
+        CGEventSetFlags(up, flags)
+
+    CGEventPost(kCGHIDEventTap, down)
+    CGEventPost(kCGHIDEventTap, up)
+
+
+def _image_ref_to_gray(image_ref, converter: bgra_gray_converter, downscale: int = 1) -> np.ndarray:
+    """
+    Convert a BGRA CGImage to a grayscale NumPy array, reading the provider buffer in place.
+    """
+    width = CGImageGetWidth(image_ref)
+    height = CGImageGetHeight(image_ref)
+    bytes_per_row = CGImageGetBytesPerRow(image_ref)
+    provider = CGImageGetDataProvider(image_ref)
+    data = CGDataProviderCopyData(provider)
+    try:
+        buf = memoryview(data)
+    except TypeError:
+        buf = bytes(data)
+    return converter.convert(buf, width, height, bytes_per_row, downscale=downscale)
+
+
+class display_geometry:
+    def __init__(self, display_id=None):
+        """
+        Point bounds, pixel size and Retina scale of a display, computed once and shared by
+        capture and clicking. Recomputed only after a display reconfiguration callback or
+        when CGDisplayBounds (cheap, no capture) no longer matches the cached bounds.
+        """
+        self.display_id = CGMainDisplayID() if display_id is None else display_id
+        self.generation = 0
+        self._cached = None
+        try:
+            CGDisplayRegisterReconfigurationCallback(self._on_reconfigure, None)
+            self._registered = True
+        except Exception:
+            self._registered = False
+
+    def _on_reconfigure(self, display, flags, user_info) -> None:
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        self._cached = None
+        self.generation += 1
+
+    def _measure(self, bounds) -> dict:
+        point_w = float(bounds.size.width)
+        point_h = float(bounds.size.height)
+        # Measure a real capture, exactly as the click code used to, but once per configuration.
+        image_ref = CGDisplayCreateImage(self.display_id)
+        if image_ref is None:
+            raise RuntimeError("Failed to capture display for geometry.")
+        pixel_w = float(CGImageGetWidth(image_ref))
+        pixel_h = float(CGImageGetHeight(image_ref))
+        return {
+            "bounds": (point_w, point_h),
+            "pixel_size": (int(pixel_w), int(pixel_h)),
+            "scale_x": pixel_w / point_w if point_w else 1.0,
+            "scale_y": pixel_h / point_h if point_h else 1.0,
+        }
+
+    def get(self) -> dict:
+        """
+        {"bounds": (point_w, point_h), "pixel_size": (pixel_w, pixel_h), "scale_x", "scale_y"}
+        """
+        bounds = CGDisplayBounds(self.display_id)
+        key = (float(bounds.size.width), float(bounds.size.height))
+        if self._cached is None or self._cached["bounds"] != key:
+            if self._cached is not None:
+                self.generation += 1
+            self._cached = self._measure(bounds)
+        return self._cached
+
+
+class quartz_frame_source(frame_source):
+    def __init__(self, geometry: display_geometry | None = None):
+        """
+        Frames from the live display. Full frames use CGWindowListCreateImage; regions use
+        CGDisplayCreateImageForRect so only the requested rectangle is read back.
+        """
+        self.geometry = geometry if geometry is not None else display_geometry()
+        self.display_id = self.geometry.display_id
+        self.converter = bgra_gray_converter()
+
+    def size(self) -> Tuple[int, int]:
+        return self.geometry.get()["pixel_size"]
+
+    def align(self, region: Region) -> Region:
+        """
+        Snap the region to whole display points so the Retina readback has exactly the
+        requested pixel size and origin.
+        """
+        s = max(1, int(round(self.geometry.get()["scale_x"])))
+        left, top, width, height = region
+        right = -(-(left + width) // s) * s
+        bottom = -(-(top + height) // s) * s
+        left -= left % s
+        top -= top % s
+        return left, top, right - left, bottom - top
+
+    def grab(self, region: Region | None = None) -> np.ndarray:
+        if region is None:
+            bounds = CGDisplayBounds(self.display_id)
+            image_ref = CGWindowListCreateImage(
+                bounds, kCGWindowListOptionOnScreenOnly, kCGNullWindowID, kCGWindowImageDefault
+            )
+            if image_ref is None:
+                raise RuntimeError("Failed to capture main display.")
+            return _image_ref_to_gray(image_ref, self.converter)
+
+        left, top, width, height = region
+        s = self.geometry.get()["scale_x"]
+        rect = CGRectMake(left / s, top / s, width / s, height / s)
+        image_ref = CGDisplayCreateImageForRect(self.display_id, rect)
+        if image_ref is None:
+            raise RuntimeError("Failed to capture display region.")
+        return _image_ref_to_gray(image_ref, self.converter)[:height, :width]
+
+
+class macos_backend(backend):
+    def __init__(self):
+        """
+        The live Mac: Quartz screen capture and event injection, AppKit pasteboard.
+        """
+        self.geometry = display_geometry()
+        self.frame_source = quartz_frame_source(self.geometry)
+
+    def press_keys(self, keys: list[str]) -> None:
+        try:
+            _send_keys_quartz(keys)
+        except Exception:
+            # Fallback to keyboard library if Quartz fails for any reason.
+            keyboard.press_and_release('+'.join(keys))
+
+    def click(self, x: int, y: int) -> None:
+        # Pixel coordinates (Retina-safe) to stay consistent with screenshot-based coords.
+        geometry = self.geometry.get()
+        scale_x = geometry["scale_x"]
+        scale_y = geometry["scale_y"]
+
+        x_pt = x / scale_x
+        y_pt = y / scale_y
+
+        # macOS mouse event coordinates are already top-left–origin in practice; do not flip.
+        flipped_point = CGPoint(x_pt, y_pt)
+
+        move_event = CGEventCreateMouseEvent(None, kCGEventMouseMoved, flipped_point, kCGMouseButtonLeft)
+        down_event = CGEventCreateMouseEvent(None, kCGEventLeftMouseDown, flipped_point, kCGMouseButtonLeft)
+        up_event = CGEventCreateMouseEvent(None, kCGEventLeftMouseUp, flipped_point, kCGMouseButtonLeft)
+
+        for evt in (move_event, down_event, up_event):
+            CGEventPost(kCGHIDEventTap, evt)
+
+    def get_clipboard_text(self) -> str:
+        pb = NSPasteboard.generalPasteboard()
+        if pb is None:
+            raise RuntimeError("无法访问系统剪贴板（NSPasteboard 为 None）")
+        content = pb.stringForType_(NSPasteboardTypeString)
+        return content if content is not None else ""
+
+    def write_to_clipboard(self, text: str) -> None:
+        pb = NSPasteboard.generalPasteboard()
+        if pb is None:
+            raise RuntimeError("无法访问系统剪贴板（NSPasteboard 为 None）")
+        pb.declareTypes_owner_([NSPasteboardTypeString], None)
+        pb.setString_forType_(text, NSPasteboardTypeString)
+
+    def clipboard_change_count(self) -> int:
+        pb = NSPasteboard.generalPasteboard()
+        if pb is None:
+            raise RuntimeError("无法访问系统剪贴板（NSPasteboard 为 None）")
+        return int(pb.changeCount())
+
+    def is_space_pressed(self) -> bool:
+        return is_space_pressed()
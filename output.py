@@ -0,0 +1,135 @@
+import json
+import os
+from typing import Iterable, Iterator
+
+
+def _fsync(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class result_writer:
+    def __init__(self, output_path: str, resume: bool = False, fsync_every: int = 20):
+        """
+        逐条追加结果到 {output_path}.partial（JSONL），每 fsync_every 条落盘一次；
+        close() 时原子地整理成与以往相同的 {output_path}（json.dump(..., indent=4) 格式）。
+        resume=True 时保留已有的 partial 文件，skip() 会跳过其中已完成的输入行。
+        amend() 改写已写出的记录（失败条目重试的结果），先追加到 {output_path}.amend，整理时合并。
+        """
+        self.output_path = output_path
+        self.partial_path = f"{output_path}.partial"
+        self.amend_path = f"{output_path}.amend"
+        self.fsync_every = fsync_every
+        self.done = 0
+        self._pending = 0
+
+        if resume and os.path.exists(self.partial_path):
+            self.done = self._recover()
+            self._file = open(self.partial_path, "a", encoding="utf-8")
+            self._amend_file = open(self.amend_path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.partial_path, "w", encoding="utf-8")
+            self._amend_file = open(self.amend_path, "w", encoding="utf-8")
+        # amend() indices count from the first record written by this run.
+        self._base = self.done
+
+    def _recover(self) -> int:
+        """
+        Count complete records and cut off a torn last line left by a crash.
+        """
+        good_bytes = 0
+        count = 0
+        with open(self.partial_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                good_bytes += len(line)
+                count += 1
+        with open(self.partial_path, "r+b") as f:
+            f.truncate(good_bytes)
+        return count
+
+    def skip(self, smiles_iter: Iterable[str]) -> Iterator[str]:
+        """
+        Drop the input lines already present in the partial output, checking they match.
+        """
+        smiles_iter = iter(smiles_iter)
+        if self.done:
+            with open(self.partial_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    expected = json.loads(line)["smiles"]
+                    smiles = next(smiles_iter, None)
+                    if smiles != expected:
+                        raise ValueError(
+                            f"输入文件与已有的部分结果不一致（{self.partial_path}），无法继续: "
+                            f"{smiles!r} != {expected!r}"
+                        )
+        return smiles_iter
+
+    def write(self, record: dict) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self.done += 1
+        self._pending += 1
+        if self._pending >= self.fsync_every:
+            _fsync(self._file)
+            self._pending = 0
+        else:
+            self._file.flush()
+
+    def amend(self, index: int, record: dict) -> None:
+        """
+        Replace the index-th record written by this run.
+        """
+        self._amend_file.write(json.dumps({"index": self._base + index, "record": record}) + "\n")
+        self._amend_file.flush()
+
+    def _amendments(self) -> dict[int, dict]:
+        amendments = {}
+        with open(self.amend_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn last line
+                amendments[entry["index"]] = entry["record"]
+        return amendments
+
+    def close(self, compact: bool = True) -> None:
+        """
+        Flush the partial file; with compact=True also write the final JSON array
+        (streamed, via a temp file and os.replace) and remove the partial file.
+        """
+        if self._file.closed:
+            return
+        _fsync(self._file)
+        self._file.close()
+        _fsync(self._amend_file)
+        self._amend_file.close()
+        if not compact:
+            return
+        amendments = self._amendments()
+
+        tmp_path = f"{self.output_path}.tmp"
+        with open(self.partial_path, "r", encoding="utf-8") as src, open(tmp_path, "w") as dst:
+            first = True
+            for index, line in enumerate(src):
+                record = amendments[index] if index in amendments else json.loads(line)
+                item = json.dumps(record, indent=4).replace("\n", "\n    ")
+                dst.write(("[\n    " if first else ",\n    ") + item)
+                first = False
+            dst.write("[]" if first else "\n]")
+            _fsync(dst)
+        os.replace(tmp_path, self.output_path)
+        os.remove(self.partial_path)
+        os.remove(self.amend_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Keep the partial file on failure so the batch can be resumed.
+        self.close(compact=exc_type is None)
@@ -0,0 +1,458 @@
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from typing import Callable, Iterable, Iterator, TextIO
+
+from cache import result_cache
+from smiles_tools import normalize_smiles, strip_title, validate_smiles
+
+
+def iter_smiles(source: str | TextIO) -> Iterator[str]:
+    """
+    逐行读取 smiles 文件路径或已打开的文本流（去掉首尾空白，跳过空行），
+    不把整个文件读入内存。
+    """
+    if isinstance(source, str):
+        with open(source, "r") as f:
+            yield from iter_smiles(f)
+        return
+    for line in source:
+        line = line.strip()
+        if line:
+            yield line
+
+
+class conversion_failed(Exception):
+    """
+    Raised by a convert callable when no name was obtained; reason is the failure class.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def invalid_record(smiles: str, reason: str) -> dict:
+    """Rejected before conversion, so no pass was spent on it (attempts 0)."""
+    return result_record(smiles, None, 0, f"invalid SMILES: {reason}")
+
+
+def result_record(smiles: str, iupac_name: str | None, attempts: int, failure: str | None = None) -> dict:
+    """
+    attempts: conversion passes spent on this line (0 for cache hits and repeats).
+    A failed line keeps its SMILES as the name and says why in "error".
+    """
+    if failure is None:
+        return {"smiles": smiles, "iupac_name": iupac_name, "attempts": attempts}
+    return {"smiles": smiles, "iupac_name": smiles, "error": failure, "attempts": attempts}
+
+
+def attempt(convert: Callable[[str], str], text: str) -> tuple[str | None, str | None]:
+    """
+    One conversion pass: (name, None) or (None, failure class).
+    A convert that returns its input (the old fallthrough) counts as "name_equals_input".
+    """
+    try:
+        iupac_name = convert(text)
+    except conversion_failed as e:
+        return None, e.reason
+    except Exception:
+        traceback.print_exc(file=sys.stderr)
+        return None, "exception"
+    if not iupac_name or iupac_name == text:
+        return None, "name_equals_input"
+    return iupac_name, None
+
+
+class run_control:
+    def __init__(self):
+        """
+        Pause / cancel switch for a running conversion, flipped from another thread
+        (e.g. the GUI). staged_convert checks it between molecules.
+        """
+        self._running = threading.Event()
+        self._running.set()
+        self.cancelled = False
+
+    def pause(self) -> None:
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self._running.set()
+
+    def checkpoint(self) -> bool:
+        """
+        Block while paused; False once cancelled.
+        """
+        self._running.wait()
+        return not self.cancelled
+
+
+class progress_meter:
+    def __init__(self, total: int | None = None, window: int = 100):
+        """
+        Live throughput of a run: done/total, molecules per minute and ETA over the last
+        `window` records, and the failure rate over the same records.
+        Cache hits and repeats are counted too, so the rate is records written per minute.
+        """
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self._times: deque[float] = deque(maxlen=window)
+        self._failures: deque[bool] = deque(maxlen=window)
+
+    def update(self, record: dict) -> None:
+        self.done += 1
+        self._times.append(time.monotonic())
+        self._failures.append("error" in record)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        # Rate over the window, measured from the record before it (or the start).
+        first = self._times[0] if len(self._times) == self._times.maxlen else self.started
+        counted = len(self._times) - 1 if len(self._times) == self._times.maxlen else len(self._times)
+        per_minute = counted * 60.0 / (now - first) if counted and now > first else 0.0
+        eta = None
+        if self.total is not None and per_minute > 0:
+            eta = max(0, self.total - self.done) * 60.0 / per_minute
+        return {
+            "done": self.done,
+            "total": self.total,
+            "per_minute": per_minute,
+            "eta": eta,
+            "failure_rate": sum(self._failures) / len(self._failures) if self._failures else 0.0,
+        }
+
+
+class _failed:
+    """
+    A molecule waiting for the retry pass, with every output index that shares its key.
+    """
+
+    __slots__ = ("representative", "text", "context", "reason", "lines")
+
+    def __init__(self, representative: str, text: str, context, reason: str):
+        self.representative = representative
+        self.text = text
+        self.context = context
+        self.reason = reason
+        self.lines: list[tuple[int, str]] = []  # (output index, smiles)
+
+
+def retry_failed(
+    failed: dict[str, _failed],
+    convert: Callable[[str], str],
+    amend: Callable[[int, dict], None],
+    mode: str = "plain",
+    cache: result_cache | None = None,
+    finish: Callable[[str, object], str] | None = None,
+    retries: int = 1,
+    before_retry: Callable[[], None] | None = None,
+    control: run_control | None = None,
+) -> None:
+    """
+    The deferred retry queue: run once the main pass is done, so hard molecules do not
+    hold up the rest. before_retry (e.g. chem_draw_worker.slow_down) is called first.
+    Every output line of a retried molecule is rewritten through amend(index, record).
+    """
+    if not failed or retries <= 0:
+        return
+    if before_retry is not None:
+        before_retry()
+    for key, item in failed.items():
+        if control is not None and not control.checkpoint():
+            return
+        iupac_name, reason, attempts = None, item.reason, 1
+        while iupac_name is None and attempts <= retries:
+            attempts += 1
+            iupac_name, reason = attempt(convert, item.text)
+        if iupac_name is not None:
+            if finish is not None:
+                iupac_name = finish(iupac_name, item.context)
+            if cache is not None:
+                cache.put(key, iupac_name, mode)
+        for n, (index, smiles) in enumerate(item.lines):
+            amend(index, result_record(smiles, iupac_name, attempts if n == 0 else 0, reason))
+
+
+def convert_stream(
+    smiles_iter: Iterable[str],
+    convert: Callable[[str], str],
+    mode: str = "plain",
+    cache: result_cache | None = None,
+    convert_many: Callable[[list[str]], list[tuple[str | None, str | None]]] | None = None,
+    batch_size: int = 1,
+    validate: bool = True,
+    amend: Callable[[int, dict], None] | None = None,
+    retries: int = 1,
+    before_retry: Callable[[], None] | None = None,
+) -> Iterator[dict]:
+    """
+    按输入顺序逐条产出 {"smiles", "iupac_name", "attempts"}：等价的写法只驱动 ChemDraw 一次，
+    命中缓存的条目不再转换。
+    batch_size > 1 且给出 convert_many 时，每凑满 batch_size 个待转换的分子调用一次
+    convert_many（例如 chem_draw_worker.convert_many，一次粘贴多个结构），
+    它对每个输入返回 (名称, None) 或 (None, 失败类别)。
+    validate=True 时语法错误的 SMILES（smiles_tools.validate_smiles）不送入 ChemDraw，
+    记录为 {"smiles", "iupac_name": 原样, "error": 原因}。
+    转换失败的条目先记录为 {"smiles", "iupac_name": 原样, "error": 失败类别, "attempts"}；
+    给出 amend 时，全部产出后再用更慢的设置重试 retries 次（见 retry_failed），结果通过 amend 改写。
+    """
+    seen: dict[str, tuple[str | None, str | None]] = {}  # key -> (name, failure)
+    todo: dict[str, str] = {}  # key -> representative smiles, not converted yet
+    pending: list[tuple[str, str, str | None]] = []  # (smiles, key, invalid reason) waiting for their batch
+    failed: dict[str, _failed] = {}
+    index = 0
+
+    def resolve() -> Iterator[dict]:
+        nonlocal index
+        fresh = set(todo)  # their first pending line is the one that was converted
+        if todo:
+            representatives = list(todo.values())
+            if convert_many is not None and len(representatives) > 1:
+                try:
+                    outcomes = convert_many(representatives)
+                except Exception:
+                    traceback.print_exc(file=sys.stderr)
+                    outcomes = [(None, "exception")] * len(representatives)
+            else:
+                outcomes = [attempt(convert, smiles) for smiles in representatives]
+            for (key, representative), (iupac_name, failure) in zip(todo.items(), outcomes):
+                if failure is None:
+                    if cache is not None:
+                        cache.put(key, iupac_name, mode)
+                else:
+                    failed[key] = _failed(representative, representative, None, failure)
+                seen[key] = (iupac_name, failure)
+            todo.clear()
+        for smiles, key, reason in pending:
+            if reason is not None:
+                yield invalid_record(smiles, reason)
+            else:
+                iupac_name, failure = seen[key]
+                attempts = 1 if key in fresh else 0
+                fresh.discard(key)
+                if key in failed:
+                    failed[key].lines.append((index, smiles))
+                yield result_record(smiles, iupac_name, attempts, failure)
+            index += 1
+        pending.clear()
+
+    for smiles in smiles_iter:
+        key = normalize_smiles(smiles)
+        reason = validate_smiles(key) if validate else None
+        if reason is None and key not in seen and key not in todo:
+            iupac_name = cache.get(key, mode) if cache is not None else None
+            if iupac_name is None:
+                todo[key] = strip_title(smiles)  # a title after the SMILES is not sent to ChemDraw
+            else:
+                seen[key] = (iupac_name, None)
+        pending.append((smiles, key, reason))
+        if not todo or len(todo) >= batch_size:
+            yield from resolve()
+    yield from resolve()
+    if amend is not None:
+        retry_failed(failed, convert, amend, mode, cache, retries=retries, before_retry=before_retry)
+
+
+_DONE = object()
+
+
+class _stage_error(Exception):
+    pass
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> None:
+    """
+    Blocking put that gives up once another stage has failed.
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+    raise _stage_error()
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    raise _stage_error()
+
+
+def _remember(recent: OrderedDict, key: str, value, limit: int) -> None:
+    """
+    Store key as the most recent entry, dropping the oldest beyond limit.
+    """
+    recent[key] = value
+    recent.move_to_end(key)
+    if len(recent) > limit:
+        recent.popitem(last=False)
+
+
+def staged_convert(
+    smiles_iter: Iterable[str],
+    convert: Callable[[str], str],
+    sink: Callable[[dict], None],
+    mode: str = "plain",
+    cache: result_cache | None = None,
+    prepare: Callable[[str], tuple[str, object]] | None = None,
+    finish: Callable[[str, object], str] | None = None,
+    queue_size: int = 256,
+    validate: bool = True,
+    amend: Callable[[int, dict], None] | None = None,
+    retries: int = 1,
+    before_retry: Callable[[], None] | None = None,
+    control: run_control | None = None,
+    dedup_window: int = 10_000,
+) -> int:
+    """
+    convert_stream 的流水线版本：读入、预处理（规范化、校验、查缓存、prepare）、转换、后处理与写出
+    （finish、写缓存、sink）分在不同线程，之间用容量为 queue_size 的队列连接。
+    convert 在调用线程里执行（ChemDraw/Qt 所需），其余阶段与它重叠，转换从不等待磁盘或解析；
+    队列有界；去重只记住最近 dedup_window 个不同的分子，更早出现过的重复条目改由缓存命中
+    （缓存关闭时重新转换），所以内存占用不随输入长度增长。失败的分子在重试前一直保留
+    （每个失败分子一条，含其所有行号）。
+    prepare(smiles) -> (送入 convert 的文本, context)，finish(name, context) -> 最终名称，
+    例如 split 模式的惰性气体替换与还原。sink 按输入顺序收到与 convert_stream 相同的记录，
+    失败条目的重试与 amend 也与 convert_stream 相同。返回写出的记录数。
+    control（run_control）可以在每个分子转换前暂停或取消：取消时已转换的条目照常写出，
+    其余输入不再读取，也不做重试。
+    """
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    to_prepare: queue.Queue = queue.Queue(queue_size)
+    to_convert: queue.Queue = queue.Queue(queue_size)
+    to_write: queue.Queue = queue.Queue(queue_size)
+    failed: dict[str, _failed] = {}
+    written = 0
+
+    def run_stage(body: Callable[[], None]) -> Callable[[], None]:
+        def target():
+            try:
+                body()
+            except _stage_error:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+        return target
+
+    def read():
+        for smiles in smiles_iter:
+            _put(to_prepare, smiles, stop)
+        _put(to_prepare, _DONE, stop)
+
+    # Items are (kind, smiles, key, value, context):
+    #   "invalid"  value = reason            "repeat"  key seen earlier in the run
+    #   "cached"   value = name              "convert" value = text for convert
+    #   "done"     value = raw name          "failed"  value = failure class
+    def preprocess():
+        # The writer's `finished` sees the same keys in the same order, so a key still
+        # in this window is still in its window too.
+        seen: OrderedDict[str, None] = OrderedDict()
+        while (smiles := _get(to_prepare, stop)) is not _DONE:
+            key = normalize_smiles(smiles)
+            reason = validate_smiles(key) if validate else None
+            if reason is not None:
+                item = ("invalid", smiles, key, reason, None)
+            elif key in seen:
+                seen.move_to_end(key)
+                item = ("repeat", smiles, key, None, None)
+            else:
+                _remember(seen, key, None, dedup_window)
+                cached = cache.get(key, mode) if cache is not None else None
+                if cached is not None:
+                    item = ("cached", smiles, key, cached, None)
+                elif prepare is not None:
+                    item = ("convert", smiles, key, *prepare(strip_title(smiles)))
+                else:
+                    item = ("convert", smiles, key, strip_title(smiles), None)
+            _put(to_convert, item, stop)
+        _put(to_convert, _DONE, stop)
+
+    def write():
+        nonlocal written
+        finished: OrderedDict[str, tuple[str | None, str | None]] = OrderedDict()  # key -> (name, failure)
+        while (item := _get(to_write, stop)) is not _DONE:
+            kind, smiles, key, value, context = item
+            if kind == "invalid":
+                record = invalid_record(smiles, value)
+            elif kind == "repeat":
+                iupac_name, failure = finished[key]
+                finished.move_to_end(key)
+                if key in failed:
+                    failed[key].lines.append((written, smiles))
+                record = result_record(smiles, iupac_name, 0, failure)
+            elif kind == "cached":
+                _remember(finished, key, (value, None), dedup_window)
+                record = result_record(smiles, value, 0)
+            elif kind == "done":
+                iupac_name = finish(value, context) if finish is not None else value
+                if cache is not None:
+                    cache.put(key, iupac_name, mode)
+                _remember(finished, key, (iupac_name, None), dedup_window)
+                record = result_record(smiles, iupac_name, 1)
+            else:
+                text, context = context
+                if key not in failed:  # else it failed before and left the window
+                    failed[key] = _failed(smiles, text, context, value)
+                failed[key].lines.append((written, smiles))
+                _remember(finished, key, (None, value), dedup_window)
+                record = result_record(smiles, None, 1, value)
+            sink(record)
+            written += 1
+
+    threads = [
+        threading.Thread(target=run_stage(body), daemon=True)
+        for body in (read, preprocess, write)
+    ]
+    for t in threads:
+        t.start()
+    cancelled = False
+    try:
+        while (item := _get(to_convert, stop)) is not _DONE:
+            kind, smiles, key, text, context = item
+            if kind == "convert":
+                if control is not None and not control.checkpoint():
+                    cancelled = True
+                    break
+                iupac_name, failure = attempt(convert, text)
+                if failure is None:
+                    item = ("done", smiles, key, iupac_name, context)
+                else:
+                    item = ("failed", smiles, key, failure, (text, context))
+            _put(to_write, item, stop)
+        _put(to_write, _DONE, stop)
+        if cancelled:
+            # The writer drains what was converted; then release the reader and preprocessor.
+            threads[2].join()
+            stop.set()
+    except _stage_error:
+        pass
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    if amend is not None and not cancelled:
+        retry_failed(failed, convert, amend, mode, cache, finish, retries, before_retry, control)
+    return written
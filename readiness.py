@@ -0,0 +1,59 @@
+import time
+from typing import Callable
+
+import numpy as np
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float, interval: float = 0.01) -> bool:
+    """
+    Poll predicate until it returns True or timeout seconds pass.
+    Returns whether the condition was met.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def frames_differ(a: np.ndarray, b: np.ndarray, tolerance: int = 50) -> bool:
+    """
+    True if more than `tolerance` pixels differ (ignores a blinking caret and similar noise).
+    """
+    if a.shape != b.shape:
+        return True
+    return int(np.count_nonzero(a != b)) > tolerance
+
+
+def wait_for_settle(
+    capture: Callable[[], np.ndarray],
+    baseline: np.ndarray | None = None,
+    timeout: float = 3.0,
+    interval: float = 0.05,
+    stable_frames: int = 2,
+    tolerance: int = 50,
+) -> tuple[np.ndarray, bool]:
+    """
+    反复截图，直到画面相对 baseline 发生变化并且连续 stable_frames 帧不再变化。
+    返回 (最后一帧, 是否在超时前稳定)。超时后仍返回最后一帧，调用方可按旧逻辑继续。
+    """
+    deadline = time.monotonic() + timeout
+    frame = capture()
+    changed = baseline is None or frames_differ(frame, baseline, tolerance)
+    stable = 0
+    while True:
+        if changed and stable >= stable_frames - 1:
+            return frame, True
+        if time.monotonic() >= deadline:
+            return frame, False
+        time.sleep(interval)
+        prev, frame = frame, capture()
+        if not changed:
+            changed = frames_differ(frame, baseline, tolerance)
+            stable = 0
+        elif frames_differ(frame, prev, tolerance):
+            stable = 0
+        else:
+            stable += 1
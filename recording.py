@@ -0,0 +1,137 @@
+import json
+import os
+import time
+from typing import Iterator, Tuple
+
+import numpy as np
+
+INDEX_NAME = "index.jsonl"
+
+
+class session_recorder:
+    def __init__(self, path: str, chunk_size: int = 64):
+        """
+        Record what draw_chem saw and did, for offline tuning of the detector (replay.py).
+        path is a directory holding:
+          frames_NNNNN.npy  uint8 (chunk_size, 2, H, W) pre/post frame pairs, written through
+                            np.lib.format.open_memmap and read back with mmap_mode="r";
+          index.jsonl       one JSON line per molecule: smiles, chunk and slot of its frames,
+                            capture origin, candidate points, click attempts with their
+                            clipboard outcome, outcome and name.
+        A new chunk starts when one is full or the frame shape changes. Appending to an
+        existing directory continues after its last chunk.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        os.makedirs(path, exist_ok=True)
+        existing = sorted(name for name in os.listdir(path) if name.startswith("frames_") and name.endswith(".npy"))
+        self._next_chunk = int(existing[-1][len("frames_"):-len(".npy")]) + 1 if existing else 0
+        self._chunk = None
+        self._chunk_name = None
+        self._slot = 0
+        self._index = open(os.path.join(path, INDEX_NAME), "a", encoding="utf-8")
+
+    def _slot_for(self, shape: Tuple[int, int]) -> Tuple[str, int]:
+        if self._chunk is None or self._chunk.shape[2:] != shape or self._slot >= self.chunk_size:
+            self._close_chunk()
+            self._chunk_name = f"frames_{self._next_chunk:05d}.npy"
+            self._next_chunk += 1
+            self._chunk = np.lib.format.open_memmap(
+                os.path.join(self.path, self._chunk_name), mode="w+", dtype=np.uint8,
+                shape=(self.chunk_size, 2) + tuple(shape),
+            )
+            self._slot = 0
+        slot = self._slot
+        self._slot += 1
+        return self._chunk_name, slot
+
+    def _close_chunk(self) -> None:
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+
+    def record(
+        self,
+        smiles: str,
+        pre: np.ndarray,
+        post: np.ndarray,
+        origin: Tuple[int, int],
+        cropped: bool,
+        points: list[Tuple[int, int]],
+        clicks: list[dict],
+        click_offsets: Tuple[int, ...],
+        outcome: str,
+        iupac_name: str,
+    ) -> None:
+        """
+        One molecule. points are in display pixels; clicks are {"rank", "offset", "copied"}
+        (copied: clipboard text, or None if the clipboard did not change). cropped tells
+        whether the frames are a capture region (searched in full) or the whole display.
+        """
+        entry = {
+            "time": time.time(),
+            "smiles": smiles,
+            "outcome": outcome,
+            "iupac_name": iupac_name,
+            "origin": list(origin),
+            "cropped": cropped,
+            "points": [list(p) for p in points],
+            "click_offsets": list(click_offsets),
+            "clicks": clicks,
+        }
+        if pre is not None and post is not None and pre.shape == post.shape:
+            chunk, slot = self._slot_for(pre.shape)
+            self._chunk[slot, 0] = pre
+            self._chunk[slot, 1] = post
+            entry["chunk"] = chunk
+            entry["slot"] = slot
+        self._index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._index.flush()
+
+    def close(self) -> None:
+        self._close_chunk()
+        if not self._index.closed:
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class session_reader:
+    def __init__(self, path: str):
+        """
+        Read a session_recorder directory. Frames are memory-mapped, so iterating touches
+        only the pages of the molecules actually used.
+        """
+        self.path = path
+        self.entries = []
+        with open(os.path.join(path, INDEX_NAME), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self.entries.append(json.loads(line))
+                except ValueError:
+                    break  # torn last line
+        self._chunks = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def frames(self, entry: dict) -> Tuple[np.ndarray, np.ndarray] | None:
+        """
+        (pre, post) views of a molecule's frames, or None if none were recorded.
+        """
+        name = entry.get("chunk")
+        if name is None:
+            return None
+        chunk = self._chunks.get(name)
+        if chunk is None:
+            chunk = self._chunks[name] = np.load(os.path.join(self.path, name), mmap_mode="r")
+        pair = chunk[entry["slot"]]
+        return pair[0], pair[1]
+
+    def __iter__(self) -> Iterator[Tuple[dict, Tuple[np.ndarray, np.ndarray] | None]]:
+        for entry in self.entries:
+            yield entry, self.frames(entry)
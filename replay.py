@@ -0,0 +1,157 @@
+import argparse
+import json
+import sys
+import time
+
+from recording import session_reader
+from scoring import BLACK_THRESHOLD, WHITE_THRESHOLD, window_scorer
+
+
+def parse_roi(value: str) -> tuple[float, float]:
+    parts = value.split(",")
+    if len(parts) != 2:
+        raise argparse.ArgumentTypeError("expected start,end fractions, e.g. 0.2,0.8")
+    return float(parts[0]), float(parts[1])
+
+
+def truth_point(entry: dict) -> tuple[int, int] | None:
+    """
+    Where the recorded run actually clicked to copy the name, or None if it never did.
+    """
+    for click in entry["clicks"] or ():
+        copied = click["copied"]
+        if copied is not None and copied != entry["smiles"]:
+            x, y = entry["points"][click["rank"]]
+            return x, y + click["offset"]
+    return None
+
+
+def first_hit(points: list[tuple[int, int]], truth: tuple[int, int], offsets, tolerance: int) -> int | None:
+    """
+    Rank of the first candidate from which one of the click offsets lands within
+    tolerance pixels (in x and y) of the truth point.
+    """
+    tx, ty = truth
+    for rank, (x, y) in enumerate(points):
+        if abs(x - tx) <= tolerance and min(abs(y + o - ty) for o in offsets) <= tolerance:
+            return rank
+    return None
+
+
+def replay(
+    reader: session_reader,
+    window: int = 99,
+    top_k: int = 20,
+    roi: tuple[float, float] | None = None,
+    mode: str = "exact",
+    pyramid_factor: int = 4,
+    white_threshold: int = WHITE_THRESHOLD,
+    black_threshold: int = BLACK_THRESHOLD,
+    tolerance: int = 10,
+    limit: int | None = None,
+    per_molecule=None,
+) -> dict:
+    """
+    Run find_max_diff_centers over every recorded frame pair with the given settings and
+    compare its candidates with where the recorded run found the name.
+    roi: searched band; default (0.2, 0.8) for whole-display frames and (0.0, 1.0) for
+    capture-region frames (the crop already is the band), as in find_candidate_points.
+    per_molecule: optional text stream for one JSON line per molecule.
+    """
+    from utils import worker
+
+    w = worker.__new__(worker)  # detection needs no backend
+    w.scorer = window_scorer(white_threshold=white_threshold, black_threshold=black_threshold)
+    w.scoring_mode = mode
+    w.pyramid_factor = pyramid_factor
+
+    molecules = with_truth = same_as_recorded = 0
+    hits_at = {1: 0, 3: 0, top_k: 0}
+    ranks = []
+    recorded_ranks = []
+    seconds = 0.0
+    for entry, frames in reader:
+        if frames is None:
+            continue
+        if limit is not None and molecules >= limit:
+            break
+        pre, post = frames
+        band = roi or ((0.0, 1.0) if entry["cropped"] else (0.2, 0.8))
+        t0 = time.perf_counter()
+        centers = w.find_max_diff_centers(pre, post, window=window, top_k=top_k, roi=band)
+        seconds += time.perf_counter() - t0
+        ox, oy = entry["origin"]
+        points = [(x + ox, y + oy) for x, y in centers]
+        molecules += 1
+        if points == [tuple(p) for p in entry["points"]]:
+            same_as_recorded += 1
+
+        truth = truth_point(entry)
+        rank = None
+        if truth is not None:
+            with_truth += 1
+            rank = first_hit(points, truth, entry["click_offsets"], tolerance)
+            recorded_ranks.append(first_hit([tuple(p) for p in entry["points"]], truth, entry["click_offsets"], tolerance))
+            if rank is not None:
+                ranks.append(rank)
+                for k in hits_at:
+                    if rank < k:
+                        hits_at[k] += 1
+        if per_molecule is not None:
+            per_molecule.write(json.dumps(
+                {"smiles": entry["smiles"], "outcome": entry["outcome"], "truth": truth, "rank": rank},
+                ensure_ascii=False,
+            ) + "\n")
+
+    recorded_found = [r for r in recorded_ranks if r is not None]
+    return {
+        "molecules": molecules,
+        "with_truth": with_truth,
+        **{f"hit@{k}": hits_at[k] / with_truth if with_truth else None for k in sorted(hits_at)},
+        "mean_rank": sum(ranks) / len(ranks) if ranks else None,
+        "recorded_mean_rank": sum(recorded_found) / len(recorded_found) if recorded_found else None,
+        "same_as_recorded": same_as_recorded / molecules if molecules else None,
+        "seconds_per_molecule": seconds / molecules if molecules else None,
+        "molecules_per_second": molecules / seconds if seconds else None,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Replay a recorded session (cli.py --record DIR) through find_max_diff_centers.",
+    )
+    parser.add_argument("session", help="cli.py --record 写出的目录")
+    parser.add_argument("--window", type=int, default=99)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--roi", type=parse_roi, default=None,
+                        help="搜索带 start,end（比例）；默认整屏 0.2,0.8，截取区域 0,1")
+    parser.add_argument("--mode", choices=("exact", "pyramid"), default="exact")
+    parser.add_argument("--pyramid-factor", type=int, default=4)
+    parser.add_argument("--white-threshold", type=int, default=WHITE_THRESHOLD)
+    parser.add_argument("--black-threshold", type=int, default=BLACK_THRESHOLD)
+    parser.add_argument("--tolerance", type=int, default=10, help="候选点与实际点击位置允许的像素误差")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--per-molecule", help="每个分子一行 JSONL 的结果文件")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    reader = session_reader(args.session)
+    per_molecule = open(args.per_molecule, "w", encoding="utf-8") if args.per_molecule else None
+    try:
+        summary = replay(
+            reader, window=args.window, top_k=args.top_k, roi=args.roi, mode=args.mode,
+            pyramid_factor=args.pyramid_factor, white_threshold=args.white_threshold,
+            black_threshold=args.black_threshold, tolerance=args.tolerance, limit=args.limit,
+            per_molecule=per_molecule,
+        )
+    finally:
+        if per_molecule is not None:
+            per_molecule.close()
+    print(json.dumps(summary, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
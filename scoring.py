@@ -0,0 +1,129 @@
+from typing import Tuple
+
+import numpy as np
+
+# Window scoring: a window of the "before" frame counts as white above WHITE_THRESHOLD
+# (higher = closer to pure white); "after" pixels at or below BLACK_THRESHOLD are text.
+WHITE_THRESHOLD = 245
+BLACK_THRESHOLD = 60
+
+
+def fraction_score_map(
+    mat_a: np.ndarray, dark_b: np.ndarray, window: int, white_threshold: int = WHITE_THRESHOLD
+) -> np.ndarray:
+    """
+    Float score of every window position: whiteness of mat_a times the fraction of dark
+    pixels of mat_b in the window (dark_b: boolean mask or per-pixel fraction).
+    Used for frames that are not uint8 and for the coarse pyramid level.
+    """
+    area = window * window
+    acc = np.int64 if np.issubdtype(mat_a.dtype, np.integer) else np.float64
+
+    def integral_image(arr: np.ndarray) -> np.ndarray:
+        padded = np.pad(arr, ((1, 0), (1, 0)), mode="constant", constant_values=0)
+        return padded.cumsum(axis=0).cumsum(axis=1)
+
+    def window_sums(integral: np.ndarray) -> np.ndarray:
+        w = window
+        return (
+            integral[w:, w:]
+            - integral[:-w, w:]
+            - integral[w:, :-w]
+            + integral[:-w, :-w]
+        )
+
+    mean_a = window_sums(integral_image(mat_a.astype(acc))) / float(area)
+    # Count of dark pixels in B (higher -> more black text).
+    dark_count = window_sums(integral_image(dark_b.astype(acc)))
+
+    whiteness = np.clip((mean_a - white_threshold) / (255 - white_threshold), 0.0, 1.0)
+    density = dark_count / float(area)
+    return whiteness * density
+
+
+class window_scorer:
+    def __init__(
+        self,
+        strip_rows: int = 256,
+        white_threshold: int = WHITE_THRESHOLD,
+        black_threshold: int = BLACK_THRESHOLD,
+    ):
+        """
+        Integer window scores of two uint8 frames, computed strip by strip in buffers that
+        are reused while the frame shape stays the same, so scoring a 5K frame does not
+        allocate hundreds of MB per molecule.
+
+        score = clip(sum_a - white * area, 0, (255 - white) * area) * dark_count,
+        i.e. fraction_score_map scaled by (255 - white) * area**2: same order, but exact
+        (ties stay ties). It fits int32 for windows up to 121 px at the default thresholds;
+        integrals of a strip of (strip_rows + window) rows fit int32 for any screen width
+        below ~20000 px. The thresholds are attributes so recorded sessions can be replayed
+        with other values (replay.py).
+        """
+        self.strip_rows = strip_rows
+        self.white_threshold = white_threshold
+        self.black_threshold = black_threshold
+        self._scratch = {}
+        self.peak_bytes = 0  # largest set of buffers held so far
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buf.nbytes for bufs in self._scratch.values() for buf in bufs)
+
+    def _buffers(self, shape: Tuple[int, int], window: int) -> Tuple[np.ndarray, ...]:
+        key = (shape, window, self.white_threshold)
+        bufs = self._scratch.get(key)
+        if bufs is None:
+            h, w = shape
+            oh, ow = h - window + 1, w - window + 1
+            strip = min(self.strip_rows, oh)
+            area = window * window
+            score_dtype = np.int32 if (255 - self.white_threshold) * area * area < 2**31 else np.int64
+            bufs = (
+                np.empty((oh, ow), dtype=score_dtype),                       # scores
+                np.zeros((strip + window, w + 1), dtype=np.int32),           # strip integral
+                np.empty((strip, ow), dtype=np.int32),                       # strip dark counts
+                np.empty((strip + window - 1, w), dtype=np.bool_),           # strip dark mask
+            )
+            self._scratch = {key: bufs}
+            self.peak_bytes = max(self.peak_bytes, self.nbytes)
+        return bufs
+
+    @staticmethod
+    def _window_sums(src: np.ndarray, integral: np.ndarray, window: int, out: np.ndarray) -> None:
+        """
+        Sums of every window x window block of src into out, through integral (one row
+        and one column larger than src, zero first row and column), all in place.
+        """
+        body = integral[1:, 1:]
+        np.copyto(body, src)
+        np.cumsum(body, axis=0, out=body)
+        np.cumsum(body, axis=1, out=body)
+        w = window
+        np.subtract(integral[w:, w:], integral[:-w, w:], out=out)
+        out -= integral[w:, :-w]
+        out += integral[:-w, :-w]
+
+    def score(self, mat_a: np.ndarray, mat_b: np.ndarray, window: int) -> np.ndarray:
+        """
+        Scores of every window position of the uint8 frames mat_a/mat_b, shape
+        (H - window + 1, W - window + 1). The result is a view of a reused buffer: it is
+        overwritten by the next call.
+        """
+        h, w = mat_a.shape
+        score, integral, dark, mask = self._buffers((h, w), window)
+        area = window * window
+        white_floor = self.white_threshold * area
+        white_span = (255 - self.white_threshold) * area
+        for r0 in range(0, score.shape[0], dark.shape[0]):
+            r1 = min(score.shape[0], r0 + dark.shape[0])
+            rows = r1 - r0
+            ih = rows + window - 1
+            out = score[r0:r1]
+            self._window_sums(mat_a[r0:r0 + ih], integral[:ih + 1], window, out)
+            np.less_equal(mat_b[r0:r0 + ih], self.black_threshold, out=mask[:ih])
+            self._window_sums(mask[:ih], integral[:ih + 1], window, dark[:rows])
+            out -= white_floor
+            np.clip(out, 0, white_span, out=out)
+            out *= dark[:rows]
+        return score
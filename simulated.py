@@ -0,0 +1,220 @@
+import heapq
+import random
+import time
+from typing import Callable, Tuple
+
+import numpy as np
+
+from backends import backend
+from frames import synthetic_frame_source
+
+PASTE = frozenset(("command", "v"))
+START = frozenset(("option", "command", "n"))
+COPY = frozenset(("command", "c"))
+SELECT_ALL = frozenset(("command", "a"))
+DELETE = frozenset(("backspace",))
+
+_ALIASES = {"cmd": "command", "meta": "command", "super": "command", "alt": "option", "opt": "option"}
+
+
+def _box_contains(box: Tuple[int, int, int, int], x: int, y: int, tolerance: int) -> bool:
+    left, top, right, bottom = box
+    return left - tolerance <= x <= right + tolerance and top - tolerance <= y <= bottom + tolerance
+
+
+class simulated_backend(backend):
+    def __init__(
+        self,
+        width: int = 1920,
+        height: int = 1080,
+        paste_latency: float = 0.05,
+        name_latency: float = 0.15,
+        copy_latency: float = 0.005,
+        latency_jitter: float = 0.0,
+        render_failure_rate: float = 0.0,
+        name_failure_rate: float = 0.0,
+        copy_failure_rate: float = 0.0,
+        click_tolerance: int = 8,
+        namer: Callable[[str], str] | None = None,
+        seed: int = 0,
+    ):
+        """
+        A fake ChemDraw on a fake screen. Pasting draws a structure block for each
+        "."-separated fragment; Option+Cmd+N draws "name text" (dark glyph boxes) under
+        each structure after name_latency; clicking on a name selects it and Cmd+C copies
+        it. Latencies are real seconds (with +-latency_jitter relative jitter); each step
+        can be made to fail at a given rate. Cmd+A then Backspace clears the canvas.
+        """
+        self.width = width
+        self.height = height
+        self.paste_latency = paste_latency
+        self.name_latency = name_latency
+        self.copy_latency = copy_latency
+        self.latency_jitter = latency_jitter
+        self.render_failure_rate = render_failure_rate
+        self.name_failure_rate = name_failure_rate
+        self.copy_failure_rate = copy_failure_rate
+        self.click_tolerance = click_tolerance
+        self.namer = namer if namer is not None else (lambda smiles: f"simulated-name({smiles})")
+        self._rng = random.Random(seed)
+
+        self._clipboard = ""
+        self._change_count = 0
+        self._structures: list[dict] = []  # {"smiles", "box"}
+        self._names: list[dict] = []  # {"name", "box"}
+        self._selected: int | None = None
+        self._all_selected = False
+        self._events: list = []
+        self._seq = 0
+        self._version = 0
+        self._frame = None
+        self._frame_version = -1
+        self.counters = {"pastes": 0, "names": 0, "clicks": 0, "hits": 0, "copies": 0, "clears": 0}
+
+        self.frame_source = synthetic_frame_source(self._render)
+
+    # -- time ---------------------------------------------------------------
+
+    def _latency(self, base: float) -> float:
+        if not self.latency_jitter:
+            return base
+        return max(0.0, base * (1.0 + self.latency_jitter * self._rng.uniform(-1.0, 1.0)))
+
+    def _schedule(self, delay: float, fn: Callable[[], None]) -> None:
+        self._seq += 1
+        heapq.heappush(self._events, (time.monotonic() + delay, self._seq, fn))
+
+    def _advance(self) -> None:
+        now = time.monotonic()
+        while self._events and self._events[0][0] <= now:
+            _, _, fn = heapq.heappop(self._events)
+            fn()
+
+    def _fails(self, rate: float) -> bool:
+        return rate > 0 and self._rng.random() < rate
+
+    # -- canvas -------------------------------------------------------------
+
+    def _layout_structures(self, fragments: list[str]) -> list[dict]:
+        """
+        Lay fragments out left to right around the canvas center.
+        """
+        sizes = [(min(300, 60 + 4 * len(f)), 90) for f in fragments]
+        gap = 160
+        total = sum(w for w, _ in sizes) + gap * (len(sizes) - 1)
+        x = (self.width - total) // 2
+        top = self.height // 2 - 120
+        out = []
+        for frag, (w, h) in zip(fragments, sizes):
+            out.append({"smiles": frag, "box": (x, top, x + w, top + h)})
+            x += w + gap
+        return out
+
+    def _name_box(self, structure: dict, name: str) -> Tuple[int, int, int, int]:
+        left, _, right, bottom = structure["box"]
+        text_w = min(6 * len(name), 420)
+        lines = -(-6 * len(name) // 420)
+        cx = (left + right) // 2
+        top = bottom + 30
+        return cx - text_w // 2, top, cx + text_w // 2, top + 18 * lines - 6
+
+    def _paste(self, text: str) -> None:
+        if not text or self._fails(self.render_failure_rate):
+            return
+        self._structures.extend(self._layout_structures(text.split(".")))
+        self.counters["pastes"] += 1
+        self._version += 1
+
+    def _generate_names(self) -> None:
+        named = {id(n["structure"]) for n in self._names}
+        for s in self._structures:
+            if id(s) in named or self._fails(self.name_failure_rate):
+                continue
+            name = self.namer(s["smiles"])
+            self._names.append({"name": name, "box": self._name_box(s, name), "structure": s})
+            self.counters["names"] += 1
+        self._version += 1
+
+    def _set_clipboard(self, text: str) -> None:
+        self._clipboard = text
+        self._change_count += 1
+
+    def _clear(self) -> None:
+        self._structures.clear()
+        self._names.clear()
+        self._selected = None
+        self.counters["clears"] += 1
+        self._version += 1
+
+    def _render(self) -> np.ndarray:
+        self._advance()
+        if self._frame_version == self._version:
+            return self._frame
+        frame = np.full((self.height, self.width), 255, dtype=np.uint8)
+        for s in self._structures:
+            left, top, right, bottom = s["box"]
+            # Bond-like outline plus a couple of inner strokes.
+            frame[top:bottom, left:left + 3] = 30
+            frame[top:bottom, right - 3:right] = 30
+            frame[top:top + 3, left:right] = 30
+            frame[bottom - 3:bottom, left:right] = 30
+            frame[(top + bottom) // 2:(top + bottom) // 2 + 2, left:right] = 30
+        for n in self._names:
+            left, top, right, _ = n["box"]
+            per_line = max(1, (right - left) // 6)
+            for i in range(len(n["name"])):
+                row, col = divmod(i, per_line)
+                x = left + 6 * col
+                y = top + 18 * row
+                frame[y:y + 12, x:x + 4] = 0
+        self._frame = frame
+        self._frame_version = self._version
+        return frame
+
+    # -- backend interface --------------------------------------------------
+
+    def press_keys(self, keys: list[str]) -> None:
+        self._advance()
+        combo = frozenset(_ALIASES.get(k.lower(), k.lower()) for k in keys)
+        if combo == PASTE:
+            text = self._clipboard
+            self._schedule(self._latency(self.paste_latency), lambda: self._paste(text))
+        elif combo == START:
+            self._schedule(self._latency(self.name_latency), self._generate_names)
+        elif combo == COPY:
+            if self._selected is not None and not self._fails(self.copy_failure_rate):
+                name = self._names[self._selected]["name"]
+                self.counters["copies"] += 1
+                self._schedule(self._latency(self.copy_latency), lambda: self._set_clipboard(name))
+        elif combo == SELECT_ALL:
+            self._all_selected = True
+            return
+        elif combo == DELETE and self._all_selected:
+            self._clear()
+        self._all_selected = False
+
+    def click(self, x: int, y: int) -> None:
+        self._advance()
+        self.counters["clicks"] += 1
+        self._all_selected = False
+        self._selected = None
+        for i, n in enumerate(self._names):
+            if _box_contains(n["box"], x, y, self.click_tolerance):
+                self._selected = i
+                self.counters["hits"] += 1
+                break
+
+    def get_clipboard_text(self) -> str:
+        self._advance()
+        return self._clipboard
+
+    def write_to_clipboard(self, text: str) -> None:
+        self._advance()
+        self._set_clipboard(text)
+
+    def clipboard_change_count(self) -> int:
+        self._advance()
+        return self._change_count
+
+    def is_space_pressed(self) -> bool:
+        return True
@@ -0,0 +1,322 @@
+import re
+
+# Bracket atoms, two-letter organic-subset atoms first, then single-character tokens.
+SMILES_TOKEN_RE = re.compile(
+    r"(\[[^\[\]]*\]|Br|Cl|%\d\d|[BCNOPSFIbcnops*]|[-=#$:/\\.]|[()]|\d)"
+)
+
+# 苯环的 Kekulé 写法：C1=CC=CC=C1（环上无取代基打断），可安全改写为 c1ccccc1。
+_KEKULE_BENZENE = ["=", "C", "C", "=", "C", "C", "=", "C"]
+
+
+def tokenize_smiles(smiles: str) -> list[str] | None:
+    """
+    Split a SMILES string into tokens. Returns None if it contains characters
+    that are not SMILES syntax.
+    """
+    tokens = SMILES_TOKEN_RE.findall(smiles)
+    if sum(len(t) for t in tokens) != len(smiles):
+        return None
+    return tokens
+
+
+def _is_ring_label(token: str) -> bool:
+    return token.isdigit() or token.startswith("%")
+
+
+def _format_ring_label(n: int) -> str:
+    return str(n) if n < 10 else f"%{n}"
+
+
+def strip_title(line: str) -> str:
+    """
+    The SMILES of an input line: the first whitespace-separated field (a title may follow).
+    """
+    fields = line.split(maxsplit=1)
+    return fields[0] if fields else ""
+
+
+def normalize_smiles(smiles: str) -> str:
+    """
+    规范化 SMILES 的书写形式（不做真正的规范化，不依赖 RDKit）：
+    去掉首尾空白及行尾标题，按出现顺序重新编号环闭合，
+    并把无取代的 Kekulé 苯环写成芳香形式。
+    结构相同但写法不同的输入会得到相同的结果；无法识别的输入原样返回（去空白后）。
+    """
+    smiles = strip_title(smiles)
+    if not smiles:
+        return ""
+    tokens = tokenize_smiles(smiles)
+    if tokens is None:
+        return smiles
+
+    # Renumber ring closures: each opening takes the lowest free label.
+    open_labels: dict[str, int] = {}
+    opens_at: set[int] = set()
+    renumbered = []
+    for i, tok in enumerate(tokens):
+        if _is_ring_label(tok):
+            if tok in open_labels:
+                renumbered.append(_format_ring_label(open_labels.pop(tok)))
+            else:
+                used = set(open_labels.values())
+                label = 1
+                while label in used:
+                    label += 1
+                open_labels[tok] = label
+                opens_at.add(i)
+                renumbered.append(_format_ring_label(label))
+        else:
+            renumbered.append(tok)
+    if open_labels:
+        # Unclosed ring: not a valid structure, leave it alone.
+        return smiles
+
+    out = []
+    i = 0
+    n = len(renumbered)
+    while i < n:
+        tok = renumbered[i]
+        if (
+            tok == "C"
+            and i + 1 in opens_at
+            and renumbered[i + 2:i + 10] == _KEKULE_BENZENE
+            and i + 10 < n
+            and renumbered[i + 10] == renumbered[i + 1]
+        ):
+            label = renumbered[i + 1]
+            out.extend(["c", label, "c", "c", "c", "c", "c", label])
+            i += 11
+            continue
+        out.append(tok)
+        i += 1
+    return "".join(out)
+
+
+ELEMENTS = frozenset("""
+H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn Ga Ge As Se
+Br Kr Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy
+Ho Er Tm Yb Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf
+Es Fm Md No Lr Rf Db Sg Bh Hs Mt Ds Rg Cn Nh Fl Mc Lv Ts Og
+""".split())
+_AROMATIC_BRACKET = frozenset(("b", "c", "n", "o", "p", "s", "se", "as", "te"))
+
+# [isotope] symbol [chirality] [H count] [charge] [:class]
+_BRACKET_ATOM_RE = re.compile(
+    r"\[(\d{1,3})?([A-Z][a-z]?|[a-z][a-z]?|\*)"
+    r"(@@?|@TH[12]|@AL[12]|@SP[123]|@TB\d{1,2}|@OH\d{1,2})?"
+    r"(H\d?)?"
+    r"(\+\d{0,2}|-\d{0,2}|\+\+|--)?"
+    r"(:\d+)?\]"
+)
+_BRACKET_CACHE: dict[str, str | None] = {}
+# Like SMILES_TOKEN_RE, but a run of organic-subset atoms is one token: atom -> atom
+# needs no check, so the validator's loop only visits the interesting tokens.
+_VALIDATE_TOKEN_RE = re.compile(
+    r"(\[[^\[\]]*\]|(?:Br|Cl|[BCNOPSFIbcnops*])+|%\d\d|[-=#$:/\\.]|[()]|\d)"
+)
+
+_BONDS = frozenset("-=#$:/\\")
+# Token kinds for the validator's state machine.
+_ATOM, _BOND, _RING, _OPEN, _CLOSE, _DOT = range(6)
+_KIND = {b: _BOND for b in _BONDS}
+_KIND.update({"(": _OPEN, ")": _CLOSE, ".": _DOT})
+_KIND.update({d: _RING for d in "0123456789"})
+_AFTER_ATOM = (_ATOM, _RING, _CLOSE)
+
+# The placement rules of the state machine only look at the previous token, so they are
+# a regular language. The fast path (_certainly_valid) maps every character to its class
+# (A atom, 1 ring digit, - bond; "(", ")", ".", "%" as is, ? anything else) and splits
+# at the atoms: what links two atoms is ring labels (each maybe after a bond), closing
+# parens, then at most one of "(", "(" + bond, bond or ".". The links that end the string
+# may not open anything. Paren balance, ring pairing and bracket contents are checked
+# separately.
+_CHAR_CLASS = {i: "?" for i in range(128)}
+_CHAR_CLASS.update({ord(c): "A" for c in "BCNOPSFIbcnops*"})
+_CHAR_CLASS.update({ord(c): "1" for c in "0123456789"})
+_CHAR_CLASS.update({ord(c): "-" for c in "-=#$:/\\"})
+_CHAR_CLASS.update({ord(c): c for c in "().%"})
+_LINK_RE = re.compile(r"(?:-?(?:1|%11))*\)*(?:\(-?|-|\.)?")
+_TAIL_RE = re.compile(r"(?:-?(?:1|%11))*\)*")
+# Links already seen to match _LINK_RE; real inputs only use a few dozen.
+_GOOD_LINKS: set[str] = set()
+_BRACKET_RE = re.compile(r"\[[^\[\]]*\]")
+# A run of ring labels on one atom, with the bond written before each label.
+_RING_RUN_RE = re.compile(r"(?:[-=#$:/\\]?(?:%\d\d|\d))+")
+_RING_LABEL_RE = re.compile(r"([-=#$:/\\]?)(%\d\d|\d)")
+# str.translate tables (the fast path only sees ASCII): keep only the parens; keep only
+# the digits; turn everything but digits into spaces, so split() gives the digit runs.
+_PARENS_ONLY = {i: None for i in range(128) if chr(i) not in "()"}
+_DIGITS_ONLY = {i: None for i in range(128) if not chr(i).isdigit()}
+_DIGIT_RUNS = {i: " " for i in range(128) if not chr(i).isdigit()}
+
+
+def _check_bracket(token: str) -> str | None:
+    m = _BRACKET_ATOM_RE.fullmatch(token)
+    if m is None:
+        return f"malformed bracket atom {token}"
+    symbol = m.group(2)
+    if symbol != "*" and symbol not in ELEMENTS and symbol not in _AROMATIC_BRACKET:
+        return f"unknown element {symbol} in {token}"
+    return None
+
+
+def _certainly_valid(smiles: str) -> bool:
+    """
+    Fast path of validate_smiles for the common case, a handful of C-level string calls
+    instead of a Python step per token. True only if the string is valid; False means
+    "run the state machine", which also finds the reason.
+    """
+    bare = smiles
+    if "[" in smiles:
+        for tok in _BRACKET_RE.findall(smiles):
+            reason = _BRACKET_CACHE.get(tok, "")
+            if reason == "":
+                reason = _BRACKET_CACHE[tok] = _check_bracket(tok)
+            if reason is not None:
+                return False
+        # A bracket atom is one atom: "*" keeps the ring runs next to it apart.
+        bare = _BRACKET_RE.sub("*", smiles)
+    if "l" in bare or "r" in bare:
+        bare = bare.replace("Cl", "C").replace("Br", "B")
+    shape = bare.translate(_CHAR_CLASS)
+    links = shape.split("A")
+    if links[0] or _TAIL_RE.fullmatch(links[-1]) is None:
+        return False
+    if not _GOOD_LINKS.issuperset(links):
+        for link in links:
+            if link not in _GOOD_LINKS:
+                if _LINK_RE.fullmatch(link) is None:
+                    return False
+                _GOOD_LINKS.add(link)
+    parens = bare.translate(_PARENS_ONLY)
+    while "()" in parens:
+        parens = parens.replace("()", "")
+    if parens:
+        return False
+    if "%" in shape or "-1" in shape:
+        return _rings_closed(bare)
+    # Plain digit labels: a label repeated within one atom's run bonds the atom to
+    # itself; otherwise they pair up iff every label is used an even number of times.
+    if "11" in shape:
+        for run in bare.translate(_DIGIT_RUNS).split():
+            if len(set(run)) != len(run):
+                return False
+    labels = sorted(bare.translate(_DIGITS_ONLY))
+    return labels[::2] == labels[1::2]
+
+
+def _rings_closed(bare: str) -> bool:
+    """
+    Ring pairing with "%nn" labels or bonds written on the labels: pair them in order,
+    as the state machine does, and reject conflicting bonds.
+    """
+    open_rings = {}
+    for run in _RING_RUN_RE.findall(bare):
+        labels = _RING_LABEL_RE.findall(run)
+        if len({label for _, label in labels}) != len(labels):
+            return False
+        for bond, label in labels:
+            if label in open_rings:
+                opened_bond = open_rings.pop(label)
+                if bond and opened_bond and bond != opened_bond:
+                    return False
+            else:
+                open_rings[label] = bond
+    return not open_rings
+
+
+def validate_smiles(smiles: str) -> str | None:
+    """
+    Check SMILES syntax in one pass: characters and tokens, bracket atoms (element
+    symbols, isotope, chirality, H count, charge, atom class), balanced branches,
+    bond placement and ring-closure pairing. "*" is accepted as an atom.
+    Returns None if the string is well formed, otherwise the reason it is not.
+    This is syntax only; valences and aromaticity are left to ChemDraw.
+    """
+    if not smiles:
+        return "empty"
+    if _certainly_valid(smiles):
+        return None
+    return _validate_tokens(smiles)
+
+
+def _validate_tokens(smiles: str) -> str | None:
+    """
+    The token-by-token state machine behind validate_smiles.
+    """
+    tokens = _VALIDATE_TOKEN_RE.findall(smiles)
+    if sum(map(len, tokens)) != len(smiles):
+        pos = 0
+        for tok in tokens:
+            if not smiles.startswith(tok, pos):
+                break
+            pos += len(tok)
+        return f"unexpected character {smiles[pos]!r} at {pos}"
+
+    depth = 0
+    prev = _DOT  # start of a component behaves like after "."
+    bond_after_atom = False
+    atom_index = -1
+    open_rings: dict[str, tuple[int, str]] = {}  # label -> (atom index, bond)
+    bond = ""
+    kinds = _KIND
+    after_atom = _AFTER_ATOM
+    for tok in tokens:
+        kind = kinds.get(tok)
+        if kind is None:
+            if tok[0] == "%":
+                kind = _RING
+            else:
+                if tok[0] == "[":
+                    reason = _BRACKET_CACHE.get(tok, "")
+                    if reason == "":
+                        reason = _BRACKET_CACHE[tok] = _check_bracket(tok)
+                    if reason is not None:
+                        return reason
+                atom_index += 1
+                bond = ""
+                prev = _ATOM
+                continue
+        if kind == _RING:
+            if not (prev == _ATOM or prev == _RING or (prev == _BOND and bond_after_atom)):
+                return f"ring closure {tok} does not follow an atom"
+            if tok in open_rings:
+                opened_at, opened_bond = open_rings.pop(tok)
+                if opened_at == atom_index:
+                    return f"ring closure {tok} bonds an atom to itself"
+                if bond and opened_bond and bond != opened_bond:
+                    return f"ring closure {tok} has conflicting bonds {opened_bond} and {bond}"
+            else:
+                open_rings[tok] = (atom_index, bond)
+            bond = ""
+            prev = _RING
+        elif kind == _BOND:
+            if prev not in after_atom and prev != _OPEN:
+                return f"bond {tok} does not follow an atom"
+            bond_after_atom = prev == _ATOM or prev == _RING
+            bond = tok
+            prev = _BOND
+        elif kind == _OPEN:
+            if prev not in after_atom:
+                return "branch does not follow an atom"
+            depth += 1
+            prev = _OPEN
+        elif kind == _CLOSE:
+            if depth == 0:
+                return "unbalanced ')'"
+            if prev not in after_atom:
+                return "empty branch" if prev == _OPEN else f"branch ends with {bond or tok}"
+            depth -= 1
+            prev = _CLOSE
+        else:
+            if prev not in after_atom:
+                return "'.' does not follow an atom"
+            prev = _DOT
+    if prev not in _AFTER_ATOM:
+        return f"ends with {tokens[-1]}"
+    if depth:
+        return "unbalanced '('"
+    if open_rings:
+        return f"unclosed ring {next(iter(open_rings))}"
+    return None
@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+import pytest
+
+from bench import (
+    IMPORT_BUDGETS,
+    SAMPLE_SMILES,
+    VALIDATION_SMILES,
+    check_nms,
+    check_pyramid,
+    import_report,
+    synthetic_frame_pair,
+)
+
+
+def speckled_frame_pair(width: int = 800, height: int = 600, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    White frames with random black pixels: many near-equal scores, the hard case for NMS ties.
+    """
+    rng = np.random.default_rng(seed)
+    pre = np.full((height, width), 255, dtype=np.uint8)
+    pre[rng.random(pre.shape) < 0.02] = 0
+    post = pre.copy()
+    post[rng.random(post.shape) < 0.05] = 0
+    return pre, post
+
+
+# The reference NMS walks Python loops, so the frames are small.
+FRAME_PAIRS = {
+    "800x600 short": lambda: synthetic_frame_pair(800, 600, SAMPLE_SMILES[0]),
+    "800x600 long": lambda: synthetic_frame_pair(800, 600, SAMPLE_SMILES[2]),
+    "800x600 speckled": speckled_frame_pair,
+}
+
+
+@pytest.fixture(scope="module")
+def scoring_worker():
+    from scoring import window_scorer
+    from utils import worker
+
+    w = worker.__new__(worker)  # scoring needs no backend
+    w.scorer = window_scorer()
+    w.pyramid_factor = 4
+    return w
+
+
+@pytest.mark.parametrize("name", FRAME_PAIRS)
+def test_nms_matches_reference(scoring_worker, name):
+    pre, post = FRAME_PAIRS[name]()
+    check_nms(scoring_worker, pre, post, name)
+
+
+@pytest.mark.parametrize("name", FRAME_PAIRS)
+def test_pyramid_matches_exact(scoring_worker, name):
+    pre, post = FRAME_PAIRS[name]()
+    check_pyramid(scoring_worker, pre, post, name)
+
+
+def test_validate_fast_path_matches_state_machine():
+    """
+    validate_smiles (fast path, then the state machine) must give the same answer as the
+    state machine alone on valid inputs and on random edits of them.
+    """
+    from smiles_tools import _validate_tokens, validate_smiles
+
+    rng = random.Random(0)
+    alphabet = "()[]=#-/\\.%@+:*123456789CcNnOoSBrl"
+    for i in range(20_000):
+        smiles = list(rng.choice(VALIDATION_SMILES))
+        for _ in range(i % 4):  # 0-3 random insertions, deletions or replacements
+            pos = rng.randrange(len(smiles) + 1)
+            edit = rng.randrange(3)
+            if edit == 0:
+                smiles.insert(pos, rng.choice(alphabet))
+            elif smiles and pos < len(smiles):
+                if edit == 1:
+                    del smiles[pos]
+                else:
+                    smiles[pos] = rng.choice(alphabet)
+        text = "".join(smiles)
+        if text:
+            assert validate_smiles(text) == _validate_tokens(text), text
+
+
+@pytest.mark.parametrize("module", IMPORT_BUDGETS)
+def test_entry_point_imports(module):
+    report = import_report(module)
+    if "missing" in report:
+        pytest.skip(f"{report['missing']} is not installed")
+    forbidden = IMPORT_BUDGETS[module][1]
+    assert not set(report["loaded"]).intersection(forbidden)
@@ -0,0 +1,194 @@
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+# Upper bounds (seconds) of the stage-duration histogram buckets.
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds of the click-attempts-per-molecule histogram.
+ATTEMPT_BUCKETS = (1, 2, 3, 6, 12, 30, 60)
+
+_NULL_STAGE = nullcontext()
+
+
+class null_tracer:
+    """
+    Tracing switched off: every hook is a no-op, so draw_chem pays one attribute
+    lookup and a shared nullcontext per stage.
+    """
+
+    enabled = False
+
+    def begin(self, smiles: str) -> None:
+        pass
+
+    def stage(self, name: str):
+        return _NULL_STAGE
+
+    def note(self, key: str, value) -> None:
+        pass
+
+    def count(self, key: str, n: int = 1) -> None:
+        pass
+
+    def end(self, outcome: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _stage_timer:
+    __slots__ = ("stages", "name", "t0")
+
+    def __init__(self, stages: dict, name: str):
+        self.stages = stages
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stages[self.name] += time.perf_counter() - self.t0
+
+
+class _histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[i] += 1
+
+
+class tracer(null_tracer):
+    enabled = True
+
+    def __init__(self, jsonl_path: str | None = None, prom_path: str | None = None, prom_every: int = 10):
+        """
+        每个分子一条 trace（各阶段耗时、尝试的候选点/偏移次数、结果），写入 jsonl_path；
+        累计计数和直方图以 Prometheus textfile 格式每 prom_every 个分子写入 prom_path。
+        outcome: "success"，或 chem_draw_worker.last_failure 的失败类别（"no_render_diff"、
+        "clipboard_unchanged"、"name_equals_input"、"timeout"），批量粘贴未能配齐时为 "batch_incomplete"。
+        """
+        self.prom_path = prom_path
+        self.prom_every = prom_every
+        self._jsonl = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+        self._record = None
+        self.outcomes = defaultdict(int)
+        self.stage_hist = defaultdict(lambda: _histogram(STAGE_BUCKETS))
+        self.molecule_hist = _histogram(STAGE_BUCKETS)
+        self.attempt_hist = _histogram(ATTEMPT_BUCKETS)
+        self._since_prom = 0
+
+    def begin(self, smiles: str) -> None:
+        self._record = {
+            "smiles": smiles,
+            "start": time.time(),
+            "t0": time.perf_counter(),
+            "stages": defaultdict(float),
+            "counts": defaultdict(int),
+            "notes": {},
+        }
+
+    def stage(self, name: str):
+        if self._record is None:
+            return _NULL_STAGE
+        return _stage_timer(self._record["stages"], name)
+
+    def note(self, key: str, value) -> None:
+        if self._record is not None:
+            self._record["notes"][key] = value
+
+    def count(self, key: str, n: int = 1) -> None:
+        if self._record is not None:
+            self._record["counts"][key] += n
+
+    def end(self, outcome: str) -> None:
+        rec = self._record
+        if rec is None:
+            return
+        self._record = None
+        duration = time.perf_counter() - rec["t0"]
+
+        self.outcomes[outcome] += 1
+        self.molecule_hist.observe(duration)
+        self.attempt_hist.observe(rec["counts"].get("attempts", 0))
+        for name, seconds in rec["stages"].items():
+            self.stage_hist[name].observe(seconds)
+
+        if self._jsonl is not None:
+            self._jsonl.write(json.dumps({
+                "smiles": rec["smiles"],
+                "start": rec["start"],
+                "duration": duration,
+                "outcome": outcome,
+                "stages": dict(rec["stages"]),
+                **rec["counts"],
+                **rec["notes"],
+            }) + "\n")
+            self._jsonl.flush()
+
+        self._since_prom += 1
+        if self.prom_path and self._since_prom >= self.prom_every:
+            self.write_prometheus()
+
+    def write_prometheus(self) -> None:
+        """
+        Atomically (re)write the Prometheus textfile-collector file.
+        """
+        self._since_prom = 0
+        lines = [
+            "# HELP chemdraw_molecules_total Molecules processed, by outcome.",
+            "# TYPE chemdraw_molecules_total counter",
+        ]
+        for outcome, n in sorted(self.outcomes.items()):
+            lines.append(f'chemdraw_molecules_total{{outcome="{outcome}"}} {n}')
+
+        def histogram(name, hist, labels=""):
+            out = []
+            sep = "," if labels else ""
+            for bound, n in zip(hist.bounds, hist.buckets):
+                out.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {n}')
+            out.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {hist.count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            out.append(f"{name}_sum{suffix} {hist.sum}")
+            out.append(f"{name}_count{suffix} {hist.count}")
+            return out
+
+        lines += [
+            "# HELP chemdraw_molecule_seconds Wall time per molecule.",
+            "# TYPE chemdraw_molecule_seconds histogram",
+        ]
+        lines += histogram("chemdraw_molecule_seconds", self.molecule_hist)
+        lines += [
+            "# HELP chemdraw_stage_seconds Time per molecule spent in each draw_chem stage.",
+            "# TYPE chemdraw_stage_seconds histogram",
+        ]
+        for name, hist in sorted(self.stage_hist.items()):
+            lines += histogram("chemdraw_stage_seconds", hist, f'stage="{name}"')
+        lines += [
+            "# HELP chemdraw_click_attempts Click+copy attempts per molecule.",
+            "# TYPE chemdraw_click_attempts histogram",
+        ]
+        lines += histogram("chemdraw_click_attempts", self.attempt_hist)
+
+        tmp_path = f"{self.prom_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prom_path)
+
+    def close(self) -> None:
+        if self.prom_path:
+            self.write_prometheus()
+        if self._jsonl is not None:
+            self._jsonl.close()
+            self._jsonl = None
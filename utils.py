@@ -1,100 +1,29 @@
 from typing import Tuple
 import time
 
-import keyboard
 import numpy as np
-from PIL import Image, ImageDraw
-from Quartz import (
-    CGDataProviderCopyData,
-    CGDisplayBounds,
-    CGDisplayCreateImage,
-    CGDisplayCreateImageForRect,
-    CGEventCreateKeyboardEvent,
-    CGEventCreateMouseEvent,
-    CGEventPost,
-    CGEventSetFlags,
-    CGEventSourceKeyState,
-    CGRectMake,
-    CGImageGetBytesPerRow,
-    CGImageGetDataProvider,
-    CGImageGetHeight,
-    CGImageGetWidth,
-    CGMainDisplayID,
-    CGWindowListCreateImage,
-    CGPoint,
-    kCGEventFlagMaskAlternate,
-    kCGEventFlagMaskCommand,
-    kCGEventFlagMaskControl,
-    kCGEventFlagMaskShift,
-    kCGEventLeftMouseDown,
-    kCGEventLeftMouseUp,
-    kCGEventMouseMoved,
-    kCGEventSourceStateHIDSystemState,
-    kCGHIDEventTap,
-    kCGMouseButtonLeft,
-    kCGNullWindowID,
-    kCGWindowImageDefault,
-    kCGWindowListOptionOnScreenOnly,
-)
-from AppKit import NSPasteboard, NSPasteboardTypeString
-
-SPACE_KEYCODE = 49  # macOS virtual keycode for space
-KEYCODE_MAP = {
-    "c": 8,
-    "v": 9,
-    "n": 45,
-}
+
+from backends import backend, default_backend
+from frames import Region, detector_region
+from scoring import fraction_score_map, window_scorer
+
 
 def is_space_pressed() -> bool:
     """
     Return True if the space bar is currently held down (Quartz query, no sudo).
     """
     try:
-        return bool(CGEventSourceKeyState(kCGEventSourceStateHIDSystemState, SPACE_KEYCODE))
+        from macos_backend import is_space_pressed as quartz_is_space_pressed
+
+        return quartz_is_space_pressed()
     except Exception:
         # Be resilient if Quartz is unavailable
         return False
 
 
-def _send_keys_quartz(keys: list[str]) -> None:
-    """
-    Send a hotkey using Quartz (no sudo). Supports one main key + modifiers.
-    """
-    if not keys:
-        return
-
-    flags = 0
-    keycode = None
-    for k in keys:
-        lk = k.lower()
-        if lk in ("cmd", "command", "meta", "super"):
-            flags |= kCGEventFlagMaskCommand
-        elif lk in ("alt", "option", "opt"):
-            flags |= kCGEventFlagMaskAlternate
-        elif lk in ("ctrl", "control", "ctl"):
-            flags |= kCGEventFlagMaskControl
-        elif lk == "shift":
-            flags |= kCGEventFlagMaskShift
-        else:
-            if keycode is not None:
-                raise ValueError("Only one primary key supported in hotkey.")
-            keycode = KEYCODE_MAP.get(lk)
-
-    if keycode is None:
-        raise ValueError("No primary key specified for hotkey.")
-
-    down = CGEventCreateKeyboardEvent(None, keycode, True)
-    up = CGEventCreateKeyboardEvent(None, keycode, False)
-    if flags:
-        CGEventSetFlags(down, flags)
-        CGEventSetFlags(up, flags)
-
-    CGEventPost(kCGHIDEventTap, down)
-    CGEventPost(kCGHIDEventTap, up)
-
-
 class worker:
-    def __init__(self):
+    def __init__(self, backend: backend | None = None):
+        self.backend = backend if backend is not None else default_backend()
         self.last_gray = None
         self.last_x = None
         self.last_y = None
@@ -107,14 +36,22 @@ class worker:
         self.startKey = [
             "option", "command", "n"
         ]
-
-    @staticmethod
-    def is_space_pressed() -> bool:
+        self.log_keys = True
+        self.frame_source = self.backend.frame_source
+        self.capture_region = "auto"
+        self.capture_origin = (0, 0)
+        self._resolved_region = None
+        # find_max_diff_centers: "exact" (full resolution) or "pyramid" (coarse-to-fine).
+        self.scoring_mode = "exact"
+        self.pyramid_factor = 4
+        self.scorer = window_scorer()
+
+    def is_space_pressed(self) -> bool:
         """
         Return True if the space bar is currently held down (uses Quartz, no sudo).
         """
         try:
-            return is_space_pressed()
+            return self.backend.is_space_pressed()
         except Exception:
             # Be resilient if Quartz is unavailable
             return False
@@ -124,34 +61,30 @@ class worker:
         Capture the current main display, convert it to grayscale, and return as a NumPy array.
         Raises RuntimeError if the capture fails.
         """
-        display_id = CGMainDisplayID()
-        bounds = CGDisplayBounds(display_id)
-        image_ref = CGWindowListCreateImage(
-            bounds, kCGWindowListOptionOnScreenOnly, kCGNullWindowID, kCGWindowImageDefault
-        )
-        if image_ref is None:
-            raise RuntimeError("Failed to capture main display.")
-
-        width = CGImageGetWidth(image_ref)
-        height = CGImageGetHeight(image_ref)
-        bytes_per_row = CGImageGetBytesPerRow(image_ref)
-        provider = CGImageGetDataProvider(image_ref)
-        data = CGDataProviderCopyData(provider)
-
-        # Raw buffer is BGRA; Pillow understands the channel order when specified.
-        raw = bytes(data)
-        img = Image.frombuffer(
-            "RGBA",
-            (width, height),
-            raw,
-            "raw",
-            "BGRA",
-            bytes_per_row,
-            1,
-        )
-        # img.save(f"screenshot_main_{label}_{int(time.time()*1000)}.png")
-        gray = img.convert("L")  # Convert to grayscale
-        return np.array(gray)
+        return self.frame_source.grab(None)
+
+    def capture_gray(self, label: str = "") -> np.ndarray:
+        """
+        Capture only self.capture_region and return it as a grayscale NumPy array.
+        capture_region: None = full display, (left, top, width, height) in pixels,
+        or "auto" = the area find_max_diff_centers searches on a full frame.
+        self.capture_origin is set to the top-left pixel of the returned frame.
+        """
+        region = self.resolved_capture_region()
+        self.capture_origin = (region[0], region[1]) if region is not None else (0, 0)
+        return self.frame_source.grab(region)
+
+    def resolved_capture_region(self) -> Region | None:
+        if self.capture_region is None:
+            return None
+        size = self.frame_source.size()
+        if self._resolved_region is None or self._resolved_region[0] != size:
+            if self.capture_region == "auto":
+                region = detector_region(*size)
+            else:
+                region = self.capture_region
+            self._resolved_region = (size, self.frame_source.align(region))
+        return self._resolved_region[1]
 
 
     def find_max_diff_centers(
@@ -161,10 +94,13 @@ class worker:
         window: int = 99,
         top_k: int = 20,
         min_dist: int = 99,  # minimal allowed block distance between centers, default to window size
+        roi: Tuple[float, float] = (0.2, 0.8),  # searched band of window positions, as fractions
+        mode: str | None = None,  # "exact" or "pyramid"; defaults to self.scoring_mode
     ) -> list[Tuple[int, int]]:
         """
         在 mat_a 中寻找接近全白且在 mat_b 中新增大量黑色文字的窗口中心（x, y）。
         返回分数前 top_k 的点，这些点至少相隔 min_dist。
+        mode="pyramid" 先在缩小 pyramid_factor 倍的画面上找候选区域，再只在这些区域内按原分辨率细化。
         """
         if mat_a.shape != mat_b.shape:
             raise ValueError("Input matrices must have the same shape.")
@@ -173,66 +109,28 @@ class worker:
         if mat_a.shape[0] < window or mat_a.shape[1] < window:
             raise ValueError("Window size is larger than the provided matrices.")
 
-        white_threshold = 245  # higher = closer to pure white
-        black_threshold = 60   # lower = darker pixels considered text
-
-        area = window * window
-
-        def integral_image(arr: np.ndarray) -> np.ndarray:
-            padded = np.pad(arr, ((1, 0), (1, 0)), mode="constant", constant_values=0)
-            return padded.cumsum(axis=0).cumsum(axis=1)
-
-        def window_sums(integral: np.ndarray) -> np.ndarray:
-            w = window
-            return (
-                integral[w:, w:]
-                - integral[:-w, w:]
-                - integral[w:, :-w]
-                + integral[:-w, :-w]
+        h_ws = mat_a.shape[0] - window + 1
+        w_ws = mat_a.shape[1] - window + 1
+        y0 = max(0, int(h_ws * roi[0]))
+        y1 = max(y0 + 1, int(h_ws * roi[1]))
+        x0 = max(0, int(w_ws * roi[0]))
+        x1 = max(x0 + 1, int(w_ws * roi[1]))
+
+        mode = mode or getattr(self, "scoring_mode", "exact")
+        factor = getattr(self, "pyramid_factor", 4)
+        if mode == "pyramid" and min(mat_a.shape) // factor >= window // factor + 1:
+            selected_centers = self._pyramid_centers(
+                mat_a, mat_b, window, top_k, min_dist, (x0, y0, x1, y1), factor
             )
-
-        integral_a = integral_image(mat_a.astype(np.int64))
-        mean_a = window_sums(integral_a) / float(area)
-
-        # Count of dark pixels in B (higher -> more black text).
-        dark_mask_b = (mat_b <= black_threshold).astype(np.int64)
-        integral_dark = integral_image(dark_mask_b)
-        dark_count = window_sums(integral_dark)
-
-        whiteness = np.clip((mean_a - white_threshold) / (255 - white_threshold), 0.0, 1.0)
-        density = dark_count / float(area)
-        score = whiteness * density
-
-        h_ws, w_ws = score.shape
-        y0 = max(0, int(h_ws * 0.2))
-        y1 = max(y0 + 1, int(h_ws * 0.8))
-        x0 = max(0, int(w_ws * 0.2))
-        x1 = max(x0 + 1, int(w_ws * 0.8))
-
-        roi = score[y0:y1, x0:x1]
-        if roi.size == 0:
-            raise ValueError("ROI for max search is empty.")
-
-        flat_indices = np.argsort(roi.ravel())[::-1]  # Descending
-        roi_coords = np.array(np.unravel_index(flat_indices, roi.shape)).T  # (N, 2) [row(y),col(x)]
-        selected_centers = []
-
-        def is_far_enough(new_y, new_x, picked):
-            for prev_y, prev_x in picked:
-                if np.hypot(prev_y - new_y, prev_x - new_x) < min_dist:
-                    return False
-            return True
-
-        for idx in roi_coords:
-            top = y0 + idx[0]
-            left = x0 + idx[1]
-            center_y = top + window // 2
-            center_x = left + window // 2
-            # Check distance with previously picked centers
-            if is_far_enough(center_y, center_x, selected_centers):
-                selected_centers.append((int(center_x), int(center_y)))
-                if len(selected_centers) >= top_k:
-                    break
+        elif mode in ("exact", "pyramid"):
+            # Only the footprint of the roi band of window positions is scored.
+            score = self._score_map(mat_a[y0:y1 + window - 1, x0:x1 + window - 1],
+                                    mat_b[y0:y1 + window - 1, x0:x1 + window - 1], window)
+            if score.size == 0:
+                raise ValueError("ROI for max search is empty.")
+            selected_centers = self._pick_separated_peaks(score, x0, y0, window // 2, top_k, min_dist)
+        else:
+            raise ValueError(f"Unknown scoring mode {mode!r}.")
 
         # For compatibility, also set the .max_diff_center_x/.y to the first
         if selected_centers:
@@ -240,7 +138,179 @@ class worker:
             self.max_diff_center_y = selected_centers[0][1]
 
         return selected_centers
-    
+
+    def _score_map(self, mat_a: np.ndarray, mat_b: np.ndarray, window: int) -> np.ndarray:
+        """
+        Score of every window position (higher = whiter before, more dark text after).
+        uint8 frames go through the buffer-reusing integer scorer; the result is only valid
+        until the next call.
+        """
+        if mat_a.dtype == np.uint8 and mat_b.dtype == np.uint8:
+            return self.scorer.score(mat_a, mat_b, window)
+        scorer = self.scorer
+        return fraction_score_map(mat_a, mat_b <= scorer.black_threshold, window, scorer.white_threshold)
+
+    def _pyramid_centers(
+        self,
+        mat_a: np.ndarray,
+        mat_b: np.ndarray,
+        window: int,
+        top_k: int,
+        min_dist: float,
+        bounds: Tuple[int, int, int, int],
+        factor: int,
+    ) -> list[Tuple[int, int]]:
+        """
+        Coarse-to-fine search: score factor x factor block means and keep the best 4*top_k
+        coarse peaks (at half the NMS distance) that have any score. Only the full-resolution
+        window positions within min_dist/2 of those peaks are rescored (overlapping areas are
+        merged), and the same greedy NMS as the exact search runs over them, so text found
+        on the coarse frame yields the same centers as the exact search.
+        bounds: (x0, y0, x1, y1) of allowed window positions at full resolution.
+        """
+        x0, y0, x1, y1 = bounds
+        f = factor
+        h, w = mat_a.shape
+        hs, ws = h // f, w // f
+
+        def blocks(arr: np.ndarray) -> np.ndarray:
+            # Rows first, then columns: much faster than one sum over axes (1, 3).
+            rows = arr[:hs * f, :ws * f].reshape(hs, f, ws * f).sum(axis=1, dtype=np.uint32)
+            return rows.reshape(hs, ws, f).sum(axis=2, dtype=np.uint32).astype(np.float32) / (f * f)
+
+        small_window = max(1, (window // f) | 1)
+        scorer = self.scorer
+        coarse = fraction_score_map(
+            blocks(mat_a), blocks(mat_b <= scorer.black_threshold), small_window, scorer.white_threshold
+        )
+        shift = (window - small_window * f) // 2  # full-res offset of a coarse window position
+        cy0 = min(max(0, (y0 - shift) // f), coarse.shape[0] - 1)
+        cx0 = min(max(0, (x0 - shift) // f), coarse.shape[1] - 1)
+        cy1 = max(cy0 + 1, -(-(y1 - shift) // f))
+        cx1 = max(cx0 + 1, -(-(x1 - shift) // f))
+        coarse_centers = self._pick_separated_peaks(
+            coarse[cy0:cy1, cx0:cx1], cx0, cy0, 0, 4 * top_k, max(1.0, min_dist / (2 * f))
+        )
+
+        # Full-resolution rectangles [ry0, ry1) x [rx0, rx1) of window positions, merged
+        # until none overlap.
+        radius = int(min_dist) // 2 + 2 * f
+        rects = []
+        for cx, cy in coarse_centers:
+            if coarse[cy, cx] <= 0:
+                continue
+            px, py = cx * f - shift, cy * f - shift
+            rect = [max(y0, py - radius), min(y1, py + radius + 1),
+                    max(x0, px - radius), min(x1, px + radius + 1)]
+            if rect[0] >= rect[1] or rect[2] >= rect[3]:
+                continue
+            merged = True
+            while merged:
+                merged = False
+                for other in rects:
+                    if (rect[0] < other[1] and other[0] < rect[1]
+                            and rect[2] < other[3] and other[2] < rect[3]):
+                        rects.remove(other)
+                        rect = [min(rect[0], other[0]), max(rect[1], other[1]),
+                                min(rect[2], other[2]), max(rect[3], other[3])]
+                        merged = True
+                        break
+            rects.append(rect)
+        if not rects:
+            return []
+
+        scores, ys, xs = [], [], []
+        for ry0, ry1, rx0, rx1 in rects:
+            patch_a = mat_a[ry0:ry1 + window - 1, rx0:rx1 + window - 1]
+            patch_b = mat_b[ry0:ry1 + window - 1, rx0:rx1 + window - 1]
+            local = self._score_map(patch_a, patch_b, window)
+            ly, lx = np.indices(local.shape)
+            scores.append(local.ravel().copy())
+            ys.append((ly + ry0).ravel())
+            xs.append((lx + rx0).ravel())
+        score = np.concatenate(scores)
+        y = np.concatenate(ys)
+        x = np.concatenate(xs)
+        # Descending score, ties: larger (y, x) first, as the exact search orders its flat index.
+        order = np.lexsort((x, y, score))[::-1]
+        half = window // 2
+        return self._greedy_separated(y[order] + half, x[order] + half, top_k, min_dist, [])
+
+    @staticmethod
+    def _pick_separated_peaks(
+        roi: np.ndarray,
+        x0: int,
+        y0: int,
+        half: int,
+        top_k: int,
+        min_dist: float,
+        chunk: int = 4096,
+    ) -> list[Tuple[int, int]]:
+        """
+        Greedy NMS over the ROI score map: repeatedly take the highest remaining score
+        (ties: larger flat index first) and drop everything closer than min_dist to it.
+        Only the top candidates are sorted (partition); if they run dry the whole map is used.
+        """
+        flat = roi.ravel()
+        n = flat.size
+        roi_w = roi.shape[1]
+        pool = max(64 * top_k, 4096)
+
+        def centers(indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            rows, cols = np.divmod(indices, roi_w)
+            return rows + (y0 + half), cols + (x0 + half)
+
+        while True:
+            threshold = np.partition(flat, n - pool)[n - pool] if pool < n else flat.min()
+            above = np.flatnonzero(flat > threshold)
+            above = above[np.lexsort((above, flat[above]))][::-1]  # descending score
+            picked = worker._greedy_separated(*centers(above), top_k, min_dist, [], chunk)
+            # Every tie at the threshold follows, so the pool is an exact prefix of the full
+            # order; ties are walked a block at a time (a blank frame is one big tie).
+            seen = above.size
+            block = 16 * chunk
+            for end in range(n, 0, -block):
+                if len(picked) >= top_k:
+                    return picked
+                start = max(0, end - block)
+                ties = np.flatnonzero(flat[start:end] == threshold)[::-1] + start
+                seen += ties.size
+                worker._greedy_separated(*centers(ties), top_k, min_dist, picked, chunk)
+            if len(picked) >= top_k or seen == n:
+                return picked
+            pool = n
+
+    @staticmethod
+    def _greedy_separated(
+        cy: np.ndarray,
+        cx: np.ndarray,
+        top_k: int,
+        min_dist: float,
+        picked: list[Tuple[int, int]],
+        chunk: int = 4096,
+    ) -> list[Tuple[int, int]]:
+        """
+        Walk centers in the given (best-first) order, appending to picked each one that is
+        at least min_dist from every center already picked, until picked holds top_k.
+        """
+        min_dist_sq = float(min_dist) * float(min_dist)
+        for start in range(0, cy.size, chunk):
+            if len(picked) >= top_k:
+                break
+            y = cy[start:start + chunk]
+            x = cx[start:start + chunk]
+            alive = np.ones(y.size, dtype=bool)
+            for px, py in picked:
+                alive &= ((y - py) ** 2 + (x - px) ** 2) >= min_dist_sq
+            while alive.any():
+                j = int(np.argmax(alive))
+                picked.append((int(x[j]), int(y[j])))
+                if len(picked) >= top_k:
+                    return picked
+                alive[:j + 1] = False
+                alive &= ((y - y[j]) ** 2 + (x - x[j]) ** 2) >= min_dist_sq
+        return picked
+
     def get_greatest_diff_value(self, mat_a: np.ndarray, mat_b: np.ndarray) -> int:
         """
         Given two grayscale matrices, find the value with the greatest absolute difference.
@@ -256,34 +326,7 @@ class worker:
         Move the mouse to the given screen coordinate and perform a single left click.
         Coordinates are expected in the usual screen space (origin at top-left).
         """
-        display_id = CGMainDisplayID()
-        bounds = CGDisplayBounds(display_id)
-
-        # Use pixel dimensions (Retina-safe) to stay consistent with screenshot-based coords.
-        image_ref = CGDisplayCreateImage(display_id)
-        if image_ref is None:
-            raise RuntimeError("Failed to capture display for click.")
-
-        pixel_w = float(CGImageGetWidth(image_ref))
-        pixel_h = float(CGImageGetHeight(image_ref))
-        point_w = float(bounds.size.width)
-        point_h = float(bounds.size.height)
-
-        scale_x = pixel_w / point_w if point_w else 1.0
-        scale_y = pixel_h / point_h if point_h else 1.0
-
-        x_pt = x / scale_x
-        y_pt = y / scale_y
-
-        # macOS mouse event coordinates are already top-left–origin in practice; do not flip.
-        flipped_point = CGPoint(x_pt, y_pt)
-
-        move_event = CGEventCreateMouseEvent(None, kCGEventMouseMoved, flipped_point, kCGMouseButtonLeft)
-        down_event = CGEventCreateMouseEvent(None, kCGEventLeftMouseDown, flipped_point, kCGMouseButtonLeft)
-        up_event = CGEventCreateMouseEvent(None, kCGEventLeftMouseUp, flipped_point, kCGMouseButtonLeft)
-
-        for evt in (move_event, down_event, up_event):
-            CGEventPost(kCGHIDEventTap, evt)
+        self.backend.click(x, y)
 
         # After clicking, capture full screenshot and draw a red 100x100 box at the click center.
         # self._save_full_screenshot_with_marker(x, y, size=100)
@@ -293,10 +336,7 @@ class worker:
         Capture a square region centered at (x, y) and save to disk.
         Returns the saved file path.
         """
-        display_id = CGMainDisplayID()
-        bounds = CGDisplayBounds(display_id)
-        screen_w = int(bounds.size.width)
-        screen_h = int(bounds.size.height)
+        screen_w, screen_h = self.frame_source.size()
 
         half = size // 2
         left = max(0, x - half)
@@ -305,32 +345,10 @@ class worker:
         width = min(size, screen_w - left)
         height = min(size, screen_h - top)
 
-        rect = CGRectMake(left, top, width, height)
-        image_ref = CGDisplayCreateImageForRect(display_id, rect)
-        if image_ref is None:
-            image_ref = CGWindowListCreateImage(
-                rect, kCGWindowListOptionOnScreenOnly, kCGNullWindowID, kCGWindowImageDefault
-            )
-        if image_ref is None:
-            raise RuntimeError("Failed to capture click region.")
-
-        bytes_per_row = CGImageGetBytesPerRow(image_ref)
-        provider = CGImageGetDataProvider(image_ref)
-        data = CGDataProviderCopyData(provider)
-
-        raw = bytes(data)
-        img = Image.frombuffer(
-            "RGBA",
-            (CGImageGetWidth(image_ref), CGImageGetHeight(image_ref)),
-            raw,
-            "raw",
-            "BGRA",
-            bytes_per_row,
-            1,
-        )
+        from PIL import Image  # debug snapshots only; not needed to detect or click
 
-        # Drop alpha to avoid transparent PNG if screen-recording gives premultiplied alpha.
-        img = img.convert("RGB")
+        gray = self.frame_source.grab((left, top, width, height))
+        img = Image.fromarray(gray).convert("RGB")
 
         if path is None:
             path = f"click_region_{int(time.time()*1000)}.png"
@@ -342,25 +360,9 @@ class worker:
         Capture the full screen and draw a red square (size x size) centered at (x, y).
         Saves to disk and returns the path.
         """
-        display_id = CGMainDisplayID()
-        image_ref = CGDisplayCreateImage(display_id)
-        if image_ref is None:
-            raise RuntimeError("Failed to capture full screen.")
-
-        bytes_per_row = CGImageGetBytesPerRow(image_ref)
-        provider = CGImageGetDataProvider(image_ref)
-        data = CGDataProviderCopyData(provider)
-
-        raw = bytes(data)
-        img = Image.frombuffer(
-            "RGBA",
-            (CGImageGetWidth(image_ref), CGImageGetHeight(image_ref)),
-            raw,
-            "raw",
-            "BGRA",
-            bytes_per_row,
-            1,
-        ).convert("RGB")
+        from PIL import Image, ImageDraw
+
+        img = Image.fromarray(self.frame_source.grab(None)).convert("RGB")
 
         draw = ImageDraw.Draw(img)
         half = size // 2
@@ -392,6 +394,8 @@ class worker:
             gray, white_threshold=white_threshold, min_pixels=min_pixels, margin=margin
         )
         left, top, right, bottom = bbox
+        from PIL import Image
+
         crop = Image.fromarray(gray).crop((left, top, right, bottom)).convert("RGB")
         if path is None:
             path = f"iupac_block_{int(time.time()*1000)}.png"
@@ -407,29 +411,24 @@ class worker:
         if not keys:
             return
 
-        print('+'.join(keys))
-        try:
-            _send_keys_quartz(keys)
-        except Exception:
-            # Fallback to keyboard library if Quartz fails for any reason.
-            keyboard.press_and_release('+'.join(keys))
+        if self.log_keys:
+            print('+'.join(keys))
+        self.backend.press_keys(keys)
 
     def get_clipboard_text(self) -> str:
         """
         Return current clipboard text content; empty string if unavailable.
         """
-        pb = NSPasteboard.generalPasteboard()
-        if pb is None:
-            raise RuntimeError("无法访问系统剪贴板（NSPasteboard 为 None）")
-        content = pb.stringForType_(NSPasteboardTypeString)
-        return content if content is not None else ""
+        return self.backend.get_clipboard_text()
+
+    def get_clipboard_change_count(self) -> int:
+        """
+        Return NSPasteboard's changeCount; it increments on every write to the clipboard.
+        """
+        return self.backend.clipboard_change_count()
 
     def write_to_clipboard(self, text: str) -> None:
         """
         Write the given text to the clipboard.
         """
-        pb = NSPasteboard.generalPasteboard()
-        if pb is None:
-            raise RuntimeError("无法访问系统剪贴板（NSPasteboard 为 None）")
-        pb.declareTypes_owner_([NSPasteboardTypeString], None)
-        pb.setString_forType_(text, NSPasteboardTypeString)
\ No newline at end of file
+        self.backend.write_to_clipboard(text)